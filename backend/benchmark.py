@@ -0,0 +1,469 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import asyncio
+import argparse
+import subprocess
+
+from typing import Dict, List
+
+import httpx
+
+SEARCH_WORDS = ["Бизнес", "Центр", "Плаза", "Сити", "Парк", "Тауэр", "Гранд", "Лофт", "Вектор", "Орион"]
+
+
+async def run_load(path: str, requests: int, concurrency: int) -> float:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def fetch():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        await fetch()
+        started = time.perf_counter()
+        await asyncio.gather(*[fetch() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+
+    return requests / elapsed
+
+
+def bump_versions(db):
+    from main import DATA_VERSION, OFFICE_VERSION, bump_version
+
+    bump_version(db, DATA_VERSION)
+    bump_version(db, OFFICE_VERSION)
+
+
+def reset_caches():
+    import main
+    from report import REPORTS_PATH
+
+    shutil.rmtree(REPORTS_PATH, ignore_errors=True)
+    for cache in (main.user_cache, main.office_cache, main.office_version_cache):
+        cache.clear()
+
+
+def seed_offices(count: int):
+    import models
+    from sqlalchemy import func, insert
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(models.Office.id)).scalar()
+        rows = []
+        for i in range(existing, count):
+            rows.append({
+                "name": f"{SEARCH_WORDS[i % len(SEARCH_WORDS)]}-{SEARCH_WORDS[(i // 10) % len(SEARCH_WORDS)]} {i}",
+                "address": f"ул. Тестовая, {i}",
+                "options": "",
+                "description": "",
+                "area": 20 + i % 480,
+                "price": 100 + (i * 37) % 9900,
+                "active": True,
+                "photos": [],
+            })
+            if len(rows) == 10000:
+                db.execute(insert(models.Office), rows)
+                rows = []
+        if rows:
+            db.execute(insert(models.Office), rows)
+        if count > existing:
+            bump_versions(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_queries(paths: List[str], repeat: int) -> float:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                response = await client.get(path)
+                response.raise_for_status()
+        elapsed = time.perf_counter() - started
+
+    return elapsed / (repeat * len(paths)) * 1000
+
+
+def search_scaling(sizes: List[int], repeat: int):
+    paths = ["/offices/search/плаза", "/offices/search/центр-пар", "/offices/search/4242", "/users/search/375"]
+    for size in sizes:
+        seed_offices(size)
+        latency = asyncio.run(run_queries(paths, repeat))
+        print(f"{size:>8} offices: {latency:.2f} ms per search")
+
+
+def write_load(rows: int) -> dict:
+    import models
+    from database import SessionLocal
+
+    seed_offices(rows)
+    prefix = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        office_ids = [office_id for office_id, in db.query(models.Office.id).order_by(models.Office.id).limit(rows)]
+
+        def timed(operation) -> float:
+            started = time.perf_counter()
+            for i in range(rows):
+                operation(i)
+                db.commit()
+            return rows / (time.perf_counter() - started)
+
+        def insert_user(i: int):
+            db.add(models.User(
+                lastName="Benchmark", firstName=f"User {i}", tel=f"375-{prefix}-{i}", age=30,
+                email=f"bench-{prefix}-{i}@example.com", password="benchmark",
+                admin=False, blocked=False, token=str(uuid.uuid4())
+            ))
+
+        def insert_office(i: int):
+            db.add(models.Office(
+                name=f"Benchmark {prefix} {i}", address=f"ул. Тестовая, {i}", options="", description="x" * 2000,
+                area=20 + i % 480, price=100 + i % 9900, active=True, photos=[]
+            ))
+
+        def update_office(i: int):
+            db.query(models.Office).filter(models.Office.id == office_ids[i % len(office_ids)]).update(
+                {models.Office.description: f"{prefix} {i} " + "y" * 2000, models.Office.price: 100 + i % 9900},
+                synchronize_session=False
+            )
+
+        results = {
+            "user inserts": timed(insert_user),
+            "office inserts": timed(insert_office),
+            "office updates": timed(update_office),
+        }
+
+        db.query(models.User).filter(models.User.email.like(f"bench-{prefix}-%")).delete(synchronize_session=False)
+        db.query(models.Office).filter(models.Office.name.like(f"Benchmark {prefix} %")).delete(synchronize_session=False)
+        db.commit()
+        return results
+    finally:
+        db.close()
+
+
+def compare_indexes(rows: int):
+    from alembic import command
+    from database import alembic_config
+
+    config = alembic_config()
+    for label, migrate in (("before", lambda: command.downgrade(config, "0004")), ("after", lambda: command.upgrade(config, "head"))):
+        migrate()
+        for operation, rate in write_load(rows).items():
+            print(f"{label:>6} {operation:>14}: {rate:.1f} rows/s")
+
+
+def seed_users(count: int, applications_per_user: int):
+    import models
+    from sqlalchemy import func, insert
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(models.User.id)).filter(models.User.email.like("bench-user-%")).scalar()
+        office_ids = [office_id for office_id, in db.query(models.Office.id).order_by(models.Office.id)]
+        for start in range(existing, count, 10000):
+            users = [{
+                "lastName": "Benchmark",
+                "firstName": f"User {i}",
+                "tel": f"375-29-{i:07d}",
+                "age": 18 + i % 60,
+                "email": f"bench-user-{i}@example.com",
+                "password": "benchmark",
+                "admin": False,
+                "blocked": False,
+                "token": str(uuid.uuid4()),
+            } for i in range(start, min(start + 10000, count))]
+            user_ids = db.execute(insert(models.User).returning(models.User.id), users).scalars().all()
+
+            applications = [{
+                "id_user": user_id,
+                "id_office": office_ids[(user_id * 7 + k) % len(office_ids)],
+                "status": 1,
+            } for user_id in user_ids for k in range(min(applications_per_user, len(office_ids)))]
+            if applications:
+                db.execute(insert(models.App), applications)
+        if count > existing:
+            bump_versions(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenarios(requests: int, concurrency: int, report_requests: int) -> Dict[str, dict]:
+    import main
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        users = db.query(models.User.email, models.User.token).filter(
+            models.User.email.like("bench-user-%")
+        ).order_by(models.User.id).limit(1000).all()
+        office_ids = [office_id for office_id, in db.query(models.Office.id).order_by(models.Office.id).limit(1000)]
+    finally:
+        db.close()
+
+    rng = random.Random(42)
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with main.app.router.lifespan_context(main.app), httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        admin = {"x-admin-token": str(main.admin_token)}
+        scenarios = {
+            "login": lambda: client.post("/login", json={"email": rng.choice(users).email, "password": "benchmark"}),
+            "office list": lambda: client.get("/office", params={"limit": 50, "after_id": rng.choice(office_ids)}),
+            "search": lambda: client.get(f"/offices/search/{rng.choice(SEARCH_WORDS)}"),
+            "add favourite": lambda: client.post(f"/user/{rng.choice(users).token}/favorite/{rng.choice(office_ids)}"),
+            "favourite offices": lambda: client.get(f"/user/{rng.choice(users).token}/favorite/offices"),
+            "create application": lambda: client.post(f"/applications/{rng.choice(users).token}/{rng.choice(office_ids)}"),
+            "report export": lambda: client.get("/export/report/pdf", headers=admin),
+        }
+
+        results = {}
+        for name, send in scenarios.items():
+            count = report_requests if name == "report export" else requests
+            semaphore = asyncio.Semaphore(1 if name == "report export" else concurrency)
+            latencies = []
+
+            async def timed():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await send()
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[timed() for _ in range(count)])
+            elapsed = time.perf_counter() - started
+
+            results[name] = {
+                "throughput": count / elapsed,
+                "p50": percentile(latencies, 0.50) * 1000,
+                "p95": percentile(latencies, 0.95) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+            }
+    return results
+
+
+def compare_baseline(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolerance: float) -> List[str]:
+    regressions = []
+    for size, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            if current["p95"] > previous["p95"] * (1 + tolerance):
+                regressions.append(f"{size} {name}: p95 {previous['p95']:.1f} -> {current['p95']:.1f} ms")
+            if current["throughput"] < previous["throughput"] * (1 - tolerance):
+                regressions.append(f"{size} {name}: {previous['throughput']:.1f} -> {current['throughput']:.1f} req/s")
+    return regressions
+
+
+def load_suite(sizes: List[int], requests: int, concurrency: int, report_requests: int,
+               applications_per_user: int, baseline: str, save_baseline: str, tolerance: float) -> int:
+    results = {}
+    for size in sizes:
+        seed_offices(size)
+        seed_users(size, applications_per_user)
+        reset_caches()
+        scenarios = asyncio.run(run_scenarios(requests, concurrency, report_requests))
+        results[str(size)] = scenarios
+
+        print(f"{size} users / {size} offices")
+        for name, result in scenarios.items():
+            print(f"  {name:>18}: {result['throughput']:8.1f} req/s  p50 {result['p50']:7.1f}  p95 {result['p95']:7.1f}  p99 {result['p99']:7.1f} ms")
+
+    if save_baseline:
+        with open(save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            regressions = compare_baseline(results, json.load(baseline_file), tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+def serialization_cost(count: int, repeat: int):
+    import orjson
+    from decimal import Decimal
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    import models
+    from main import OfficeOut, office_summary, plain_json
+
+    offices = [models.Office(
+        id=i,
+        name=f"{SEARCH_WORDS[i % len(SEARCH_WORDS)]} {i}",
+        address=f"ул. Тестовая, {i}",
+        options="Парковка, кондиционер",
+        description="Светлый офис в центре города. " * 5,
+        area=Decimal(20 + i % 480),
+        price=Decimal(100 + (i * 37) % 9900),
+        active=True,
+        photos=[f"photos/store/ab/{i:064x}.jpg"],
+    ) for i in range(count)]
+    adapter = TypeAdapter(List[OfficeOut])
+
+    variants = {
+        "jsonable_encoder(ORM) + json": lambda: json.dumps(jsonable_encoder(offices), ensure_ascii=False),
+        "summary dicts + jsonable_encoder + json": lambda: json.dumps(jsonable_encoder([office_summary(office) for office in offices]), ensure_ascii=False),
+        "summary dicts + jsonable_encoder + orjson": lambda: orjson.dumps(jsonable_encoder([office_summary(office) for office in offices])),
+        "summary dicts + orjson": lambda: orjson.dumps([office_summary(office) for office in offices], default=plain_json),
+        "response model + orjson": lambda: orjson.dumps(adapter.dump_python(adapter.validate_python([office_summary(office) for office in offices]), mode="json")),
+        "response model dump_json": lambda: adapter.dump_json(adapter.validate_python([office_summary(office) for office in offices])),
+    }
+    for name, serialize in variants.items():
+        serialize()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            serialize()
+        print(f"{name:>42}: {(time.perf_counter() - started) / repeat * 1000:8.1f} ms for {count} offices")
+
+
+def range_index_cost(count: int, repeat: int, buckets: int):
+    import models
+    from sqlalchemy import ARRAY, Integer, any_, func, literal, select
+    from database import SessionLocal
+    from office_index import OfficeRangeIndex
+
+    seed_offices(count)
+    rng = random.Random(42)
+    ranges = []
+    for _ in range(repeat):
+        min_area, min_price = rng.uniform(20, 400), rng.uniform(100, 8000)
+        ranges.append((min_area, min_area + rng.uniform(10, 100), min_price, min_price + rng.uniform(100, 2000)))
+
+    db = SessionLocal()
+    try:
+        index = OfficeRangeIndex()
+        started = time.perf_counter()
+        columns = index.columns(db, 0)
+        print(f"{'index build':>28}: {(time.perf_counter() - started) * 1000:8.1f} ms for {columns.ids.size} offices")
+
+        def range_filter(query, min_area, max_area, min_price, max_price):
+            return query.filter(models.Office.area >= min_area, models.Office.area <= max_area,
+                                models.Office.price >= min_price, models.Office.price <= max_price)
+
+        def sql_facets(min_area, max_area, min_price, max_price):
+            for column, low, high, other, other_low, other_high in (
+                (models.Office.price, min_price, max_price, models.Office.area, min_area, max_area),
+                (models.Office.area, min_area, max_area, models.Office.price, min_price, max_price),
+            ):
+                bounds = db.query(func.min(column), func.max(column)).one()
+                bucket = func.least(func.width_bucket(column, bounds[0], bounds[1], buckets), buckets)
+                db.query(bucket, func.count()).filter(other >= other_low, other <= other_high).group_by(bucket).all()
+            range_filter(db.query(func.count(models.Office.id)), min_area, max_area, min_price, max_price).scalar()
+
+        def index_rows(min_area, max_area, min_price, max_price):
+            ids = columns.search(min_area, max_area, min_price, max_price)
+            db.query(models.Office).filter(models.Office.id == any_(literal(ids.tolist(), ARRAY(Integer)))).all()
+
+        variants = {
+            "sql ids": lambda *bounds: range_filter(db.query(models.Office.id), *bounds).all(),
+            "index ids": lambda *bounds: columns.search(*bounds),
+            "sql rows": lambda *bounds: range_filter(db.query(models.Office), *bounds).all(),
+            "index ids + rows by id": index_rows,
+            "sql facets": sql_facets,
+            "index facets": lambda *bounds: columns.facets(*bounds, buckets=buckets),
+        }
+        for name, run in variants.items():
+            run(*ranges[0])
+            started = time.perf_counter()
+            for bounds in ranges:
+                run(*bounds)
+            print(f"{name:>28}: {(time.perf_counter() - started) / repeat * 1000:8.3f} ms per search")
+    finally:
+        db.close()
+
+
+def compare_modes(path: str, requests: int, concurrency: int):
+    for mode, label in (("0", "sync"), ("1", "async")):
+        env = {**os.environ, "DB_ASYNC": mode}
+        output = subprocess.run(
+            [sys.executable, __file__, "db-mode", "--worker", "--path", path,
+             "--requests", str(requests), "--concurrency", str(concurrency)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        print(f"{label:>5}: {float(output):.1f} req/s ({path}, {requests} requests, concurrency {concurrency})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Akairy backend benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    db_mode = subparsers.add_parser("db-mode", help="requests/sec with the sync and the async database engine")
+    db_mode.add_argument("--path", default="/offices/search/центр")
+    db_mode.add_argument("--requests", type=int, default=2000)
+    db_mode.add_argument("--concurrency", type=int, default=50)
+    db_mode.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+
+    search = subparsers.add_parser("search", help="fuzzy search latency while the office table grows")
+    search.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    search.add_argument("--repeat", type=int, default=20)
+
+    writes = subparsers.add_parser("writes", help="insert/update throughput with the indexes before and after the index audit")
+    writes.add_argument("--rows", type=int, default=2000)
+
+    load = subparsers.add_parser("load", help="main flows at several data sizes, compared against a stored baseline")
+    load.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    load.add_argument("--requests", type=int, default=500)
+    load.add_argument("--concurrency", type=int, default=20)
+    load.add_argument("--report-requests", type=int, default=3)
+    load.add_argument("--applications-per-user", type=int, default=2)
+    load.add_argument("--baseline", help="JSON results to compare against; exits with 1 on regressions")
+    load.add_argument("--save-baseline", help="write the results as a new baseline")
+    load.add_argument("--tolerance", type=float, default=0.2)
+
+    serialize = subparsers.add_parser("serialize", help="cost of encoding an office list with each serialization path")
+    serialize.add_argument("--offices", type=int, default=10000)
+    serialize.add_argument("--repeat", type=int, default=5)
+
+    range_index = subparsers.add_parser("range-index", help="price/area range search and facets: SQL against the in-memory index")
+    range_index.add_argument("--offices", type=int, default=100000)
+    range_index.add_argument("--repeat", type=int, default=200)
+    range_index.add_argument("--buckets", type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "db-mode":
+        if args.worker:
+            print(asyncio.run(run_load(args.path, args.requests, args.concurrency)))
+        else:
+            compare_modes(args.path, args.requests, args.concurrency)
+    elif args.benchmark == "search":
+        search_scaling(args.sizes, args.repeat)
+    elif args.benchmark == "writes":
+        compare_indexes(args.rows)
+    elif args.benchmark == "serialize":
+        serialization_cost(args.offices, args.repeat)
+    elif args.benchmark == "range-index":
+        range_index_cost(args.offices, args.repeat, args.buckets)
+    elif args.benchmark == "load":
+        sys.exit(load_suite(
+            args.sizes, args.requests, args.concurrency, args.report_requests,
+            args.applications_per_user, args.baseline, args.save_baseline, args.tolerance
+        ))
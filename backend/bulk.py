@@ -0,0 +1,94 @@
+import io
+import csv
+import json
+import zipfile
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from photos import PHOTO_MAX_BYTES, PhotoError, PhotoTooLarge, store_upload
+
+IMPORT_BATCH_SIZE = 1000
+
+IMPORT_PHOTO_WORKERS = 8
+
+
+class ImportOffice(BaseModel):
+    name: str
+    address: str
+    options: str = ""
+    description: str = ""
+    area: float
+    price: float
+    photos: List[str] = []
+
+    @field_validator("photos", mode="before")
+    @classmethod
+    def split_photos(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [name.strip() for name in value.split(";") if name.strip()]
+        return value
+
+
+def read_rows(source: BinaryIO, filename: str) -> List[dict]:
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    if filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return [json.loads(line) for line in text if line.strip()]
+    return list(csv.DictReader(text))
+
+
+def parse_offices(source: BinaryIO, filename: str) -> Tuple[Dict[int, ImportOffice], Dict[int, str]]:
+    offices = {}
+    errors = {}
+    try:
+        rows = read_rows(source, filename)
+    except (ValueError, csv.Error) as e:
+        raise ValueError(f"Не удалось прочитать файл: {e}")
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors[number] = "Строка должна быть объектом"
+            continue
+        try:
+            offices[number] = ImportOffice.model_validate(
+                {key: value for key, value in row.items() if key is not None and value is not None}
+            )
+        except ValidationError as e:
+            errors[number] = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    return offices, errors
+
+
+def store_archive_member(photos_zip: zipfile.ZipFile, name: str) -> str:
+    if photos_zip.getinfo(name).file_size > PHOTO_MAX_BYTES:
+        raise PhotoTooLarge("Фото превышает допустимый размер")
+    with photos_zip.open(name) as member:
+        return store_upload(member)
+
+
+def store_archive_photos(archive: Optional[BinaryIO], names: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    stored = {}
+    errors = {}
+    if not names:
+        return stored, errors
+    if archive is None:
+        return stored, {name: "Архив с фото не передан" for name in names}
+
+    with zipfile.ZipFile(archive) as photos_zip, ThreadPoolExecutor(max_workers=IMPORT_PHOTO_WORKERS) as pool:
+        members = set(photos_zip.namelist())
+        for start in range(0, len(names), IMPORT_PHOTO_WORKERS * 4):
+            futures = {}
+            for name in names[start:start + IMPORT_PHOTO_WORKERS * 4]:
+                if name not in members:
+                    errors[name] = f"Фото {name} не найдено в архиве"
+                    continue
+                futures[name] = pool.submit(store_archive_member, photos_zip, name)
+            for name, future in futures.items():
+                try:
+                    stored[name] = future.result()
+                except (PhotoError, zipfile.BadZipFile) as e:
+                    errors[name] = f"{name}: {e}"
+    return stored, errors
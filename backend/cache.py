@@ -0,0 +1,104 @@
+import os
+import time
+import threading
+
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import models
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+OFFICE_CACHE_SIZE = int(os.getenv("OFFICE_CACHE_SIZE", "512"))
+OFFICE_CACHE_TTL = float(os.getenv("OFFICE_CACHE_TTL", "3600"))
+OFFICE_VERSION_TTL = float(os.getenv("OFFICE_VERSION_TTL", "1"))
+
+
+class UserSnapshot(NamedTuple):
+    id: int
+    token: str
+    admin: bool
+    blocked: bool
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            value, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+office_cache = TTLCache(OFFICE_CACHE_SIZE, OFFICE_CACHE_TTL)
+
+office_version_cache = TTLCache(1, OFFICE_VERSION_TTL)
+
+
+def snapshot_user(user) -> UserSnapshot:
+    return UserSnapshot(
+        id=user.id,
+        token=str(user.token),
+        admin=bool(user.admin),
+        blocked=bool(user.blocked),
+    )
+
+
+def get_cached_user(token: str, db) -> Optional[UserSnapshot]:
+    snapshot = user_cache.get(token)
+    if snapshot is not None:
+        return snapshot
+
+    existing_user = db.query(models.User).filter(models.User.token == token).first()
+    if not existing_user:
+        return None
+
+    snapshot = snapshot_user(existing_user)
+    user_cache.set(token, snapshot)
+    return snapshot
@@ -0,0 +1,185 @@
+import os
+import hmac
+import json
+import base64
+import hashlib
+import time
+import select as select_io
+import asyncio
+import threading
+
+from typing import List, Optional
+
+from sqlalchemy import ARRAY, Text, event, func, literal, select
+from sqlalchemy.orm import Session
+
+from database import engine
+
+APPLICATION_CHANNEL = "applications"
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "postgres" if engine.dialect.name == "postgresql" else "memory")
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+PENDING_EVENTS = "pending_application_events"
+
+NOTIFY_PAYLOAD_MAX = 7900
+
+EVENTS_TICKET_TTL = int(os.getenv("EVENTS_TICKET_TTL", "60"))
+
+
+def notify_payloads(batch: List[dict]) -> List[str]:
+    payloads = []
+    chunk = []
+    size = 2
+    for application_event in batch:
+        encoded = json.dumps(application_event)
+        if chunk and size + len(encoded) + 1 > NOTIFY_PAYLOAD_MAX:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk = []
+            size = 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        payloads.append("[" + ",".join(chunk) + "]")
+    return payloads
+
+
+def ticket_signature(secret: str, payload: str) -> str:
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_ticket(secret: str, user_id: Optional[int]) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"user": user_id, "exp": int(time.time()) + EVENTS_TICKET_TTL}).encode()).decode()
+    return f"{payload}.{ticket_signature(secret, payload)}"
+
+
+def read_ticket(secret: str, ticket: str) -> Optional[dict]:
+    payload, _, signature = ticket.partition(".")
+    if not hmac.compare_digest(signature.encode(), ticket_signature(secret, payload).encode()):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode()))
+    except ValueError:
+        return None
+    return claims if claims.get("exp", 0) >= time.time() else None
+
+
+class Subscription:
+    def __init__(self, user_id: Optional[int]):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+
+    def accepts(self, application_event: dict) -> bool:
+        return self.user_id is None or application_event.get("id_user") == self.user_id
+
+    def put(self, application_event: dict):
+        if not self.accepts(application_event):
+            return
+        try:
+            self.queue.put_nowait(application_event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class ApplicationEvents:
+    def __init__(self):
+        self._loop = None
+        self._subscriptions = set()
+        self._listener = None
+        self._stop = threading.Event()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        if EVENTS_BACKEND == "postgres" and self._listener is None:
+            self._stop.clear()
+            self._listener = threading.Thread(target=self._listen, name="application-events", daemon=True)
+            self._listener.start()
+
+    def stop(self):
+        self._stop.set()
+        self._listener = None
+
+    def subscribe(self, user_id: Optional[int]) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, db: Session, batch: List[dict]):
+        if not batch:
+            return
+        if EVENTS_BACKEND == "postgres":
+            payload = func.unnest(literal(notify_payloads(batch), ARRAY(Text))).table_valued("payload").render_derived()
+            db.execute(select(func.pg_notify(APPLICATION_CHANNEL, payload.c.payload)).select_from(payload))
+        else:
+            db.info.setdefault(PENDING_EVENTS, []).extend(batch)
+
+    def dispatch(self, application_event: dict):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._deliver, application_event)
+
+    def _deliver(self, application_event: dict):
+        for subscription in list(self._subscriptions):
+            subscription.put(application_event)
+
+    def _listen(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                connection.detach()
+                listener = connection.driver_connection
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f"LISTEN {APPLICATION_CHANNEL}")
+
+                while not self._stop.is_set():
+                    if select_io.select([listener], [], [], 1.0) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        notification = listener.notifies.pop(0)
+                        for application_event in json.loads(notification.payload):
+                            self.dispatch(application_event)
+            except Exception as e:
+                print(f"Error listening for application events: {e}")
+                time.sleep(1)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+application_events = ApplicationEvents()
+
+
+@event.listens_for(Session, "after_commit")
+def dispatch_pending(session: Session):
+    for application_event in session.info.pop(PENDING_EVENTS, ()):
+        application_events.dispatch(application_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending(session: Session):
+    session.info.pop(PENDING_EVENTS, None)
+
+
+async def event_stream(subscription: Subscription):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                application_event = await asyncio.wait_for(subscription.queue.get(), EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: application\ndata: {json.dumps(application_event)}\n\n"
+    finally:
+        application_events.unsubscribe(subscription)
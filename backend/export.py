@@ -0,0 +1,64 @@
+import io
+import csv
+import json
+
+from decimal import Decimal
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+
+from database import ReadSessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(item) for item in value)
+    return plain(value)
+
+
+def stream_rows(statement, fmt: str) -> Iterator[str]:
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows([csv_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps({column: plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+    finally:
+        db.close()
+
+
+def export_response(statement, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(statement, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"}
+    )
@@ -1,42 +1,64 @@
 import os
 import base64
+import hashlib
 import uuid
 import uvicorn
 import shutil
+import asyncio
+import functools
+import orjson
 
-from fastapi import FastAPI, HTTPException, Depends, Header
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from decimal import Decimal
 
-from pydantic import BaseModel, Field
-from typing import Annotated, List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, UploadFile, File, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, ORJSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import simpleSplit
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, Dict, List, Optional, Tuple, Union
 
-from datetime import datetime
-from io import BytesIO
 
-from sqlalchemy import or_, func
-from fastapi.staticfiles import StaticFiles
+from sqlalchemy import func, any_, literal, case, tuple_, select, insert, update, delete, ARRAY, Integer, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 
 import models
-from database import engine, SessionLocal
-from sqlalchemy.orm import Session
-
-app = FastAPI()
+from cache import user_cache, office_cache, office_version_cache, get_cached_user
+from office_index import FACET_BUCKETS, office_index
+from report import job_version, register_fonts, report_jobs
+from export import export_response
+from bulk import IMPORT_BATCH_SIZE, parse_offices, store_archive_photos
+from photos import PHOTO_SWEEP_INTERVAL, PhotoFiles, PhotoError, PhotoUpload, write_photo, is_stored, is_stale, stale_photos, sweep_cutoff, remove_photo, variant_paths, schedule_derivatives, shutdown_pool
+from events import EVENTS_TICKET_TTL, application_events, event_stream, issue_ticket, read_ticket
+from metrics import MetricsMiddleware, instrument_engine, render as render_metrics
+from database import prepare_schema, engine, read_engine, async_engine, async_read_engine, SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal, DB_ASYNC
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 photos_path = "photos"
 if not os.path.exists(photos_path):
     os.makedirs(photos_path)
 
-app.mount("/photos", StaticFiles(directory=photos_path), name="photos")
+
+app.mount("/photos", PhotoFiles(directory=photos_path), name="photos")
 
 
-models.Base.metadata.create_all(bind=engine)
+metric_engines = {"primary": engine}
+if read_engine is not engine:
+    metric_engines["read"] = read_engine
+if async_engine is not None:
+    metric_engines["async"] = async_engine.sync_engine
+if async_read_engine is not None and async_read_engine is not async_engine:
+    metric_engines["async_read"] = async_read_engine.sync_engine
+
+for name, metric_engine in metric_engines.items():
+    instrument_engine(metric_engine, name)
+
+app.add_middleware(MetricsMiddleware)
 
 origins = ["*"]
 
@@ -86,15 +108,81 @@ class UpdateUser(BaseModel):
     tel: str
     age: int
     email: str
-    password: str
+    password: Optional[str] = None
     blocked: bool = Field(default=False)
 
 
+class Message(BaseModel):
+    message: str
+
+
+class Detail(BaseModel):
+    detail: str
+
+
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    lastName: Optional[str]
+    firstName: Optional[str]
+    tel: Optional[str]
+    age: Optional[int]
+    email: Optional[str]
+    blocked: Optional[bool]
+
+
+class RegisteredUser(UserOut):
+    token: str
+
+
+class LoginOut(BaseModel):
+    token: str
+    role: str
+
+
+class ApplicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    id_user: Optional[int]
+    id_office: Optional[int]
+    status: Optional[int]
+
+
+class OfficeOut(BaseModel):
+    id: int
+    name: Optional[str]
+    address: Optional[str]
+    options: Optional[str]
+    description: Optional[str]
+    area: Optional[float]
+    price: Optional[float]
+    active: Optional[bool]
+    photos: List[str]
+    photo_variants: List[Dict[str, str]]
+
+
+APPLICATION_COLUMNS = (models.App.id, models.App.id_user, models.App.id_office, models.App.status)
+
+USER_COLUMNS = (
+    models.User.id, models.User.lastName, models.User.firstName, models.User.tel,
+    models.User.age, models.User.email, models.User.blocked,
+)
+
+
+class ApplicationsStatus(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=1000)
+    status: int
+    only_status: Optional[int] = None
+
+
 class SearchOffice(BaseModel):
     minArea: float
     maxArea: float
     minPrice: float
     maxPrice: float
+    active: Optional[bool] = None
 
 
 def get_db():
@@ -105,7 +193,196 @@ def get_db():
         db.close()
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+get_session = get_async_db if DB_ASYNC else get_db
+
+get_read_session = get_async_read_db if DB_ASYNC else get_read_db
+
+db_dependency = Annotated[Session, Depends(get_session)]
+
+read_db_dependency = Annotated[Session, Depends(get_read_session)]
+
+
+async def run_db(db, fn):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn)
+    return await run_in_threadpool(fn, db)
+
+
+def blocking(fn, *args):
+    # Handlers run inside AsyncSession.run_sync on the event loop in DB_ASYNC mode; file and CPU work goes to the threadpool.
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args))
+    return fn(*args)
+
+
+def db_route(handler):
+    @functools.wraps(handler)
+    async def endpoint(*args, **kwargs):
+        return await run_db(kwargs["db"], lambda session: handler(*args, **{**kwargs, "db": session}))
+
+    return endpoint
+
+OFFICE_FIELDS = {
+    "id": models.Office.id,
+    "name": models.Office.name,
+    "address": models.Office.address,
+    "options": models.Office.options,
+    "description": models.Office.description,
+    "area": models.Office.area,
+    "price": models.Office.price,
+    "active": models.Office.active,
+    "photos": models.Office.photos,
+    "photo": models.Office.photos[1],
+}
+
+OFFICE_SUMMARY_COLUMNS = (
+    models.Office.id, models.Office.name, models.Office.address, models.Office.options, models.Office.description,
+    models.Office.area, models.Office.price, models.Office.active, models.Office.photos,
+)
+
+PAGE_MAX = 500
+
+
+DATA_VERSION = "data"
+
+OFFICE_VERSION = "office"
+
+
+def bump_version(db: Session, name: str = DATA_VERSION) -> int:
+    return db.execute(
+        update(models.Version).where(models.Version.name == name).values(value=models.Version.value + 1).returning(models.Version.value)
+    ).scalar()
+
+
+def current_version(db: Session, name: str = DATA_VERSION) -> int:
+    return db.query(models.Version.value).filter(models.Version.name == name).scalar() or 0
+
+
+def ensure_version(db: Session, name: str = DATA_VERSION):
+    db.execute(pg_insert(models.Version).values(name=name, value=0).on_conflict_do_nothing(index_elements=[models.Version.name]))
+    db.commit()
+
+
+def plain_json(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def office_version(db: Session) -> int:
+    version = office_version_cache.get(OFFICE_VERSION)
+    if version is None:
+        version = current_version(db, OFFICE_VERSION)
+        office_version_cache.set(OFFICE_VERSION, version)
+    return version
+
+
+def offices_changed(version: int, upserted=(), removed=()):
+    office_version_cache.clear()
+    office_cache.clear()
+    office_index.apply(version, upserted, removed)
+
+
+def office_point(office: models.Office):
+    return office.id, office.price, office.area, office.active
+
+
+def cached_offices(db: Session, key: str, if_none_match: Optional[str], build) -> Response:
+    version = office_version(db)
+    etag = f'"office-{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    body = office_cache.get((version, key))
+    if body is None:
+        body = blocking(functools.partial(orjson.dumps, default=plain_json), build())
+        office_cache.set((version, key), body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def office_summary(office: models.Office) -> dict:
+    return {
+        "id": office.id,
+        "name": office.name,
+        "address": office.address,
+        "options": office.options,
+        "description": office.description,
+        "area": office.area,
+        "price": office.price,
+        "active": office.active,
+        "photos": office.photos or [],
+        "photo_variants": [variant_paths(photo) for photo in office.photos or []],
+    }
+
+
+def office_row(row) -> dict:
+    office = dict(row._mapping)
+    if office.get("photo"):
+        office["photo_variant"] = variant_paths(office["photo"])
+    if "photos" in office:
+        office["photo_variants"] = [variant_paths(photo) for photo in office["photos"] or []]
+    return office
+
+
+def parse_office_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in OFFICE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def page_offices(query, limit: Optional[int], after_id: Optional[int], fields: Optional[List[str]]):
+    query = query.order_by(models.Office.id)
+    if after_id is not None:
+        query = query.filter(models.Office.id > after_id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    if fields is not None:
+        rows = [office_row(row) for row in rows]
+    else:
+        rows = [office_summary(office) for office in rows]
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def office_query(db: Session, fields: Optional[List[str]]):
+    if fields is None:
+        return db.query(models.Office)
+    return db.query(*[OFFICE_FIELDS[name].label(name) for name in fields])
 
 
 def create_admin(db: Session):
@@ -122,7 +399,6 @@ def create_admin(db: Session):
             password="Pppp2005",
             admin=True,
             blocked=False,
-            offices=[],
             token=uuid.uuid4()
         )
         db.add(admin_user)
@@ -133,54 +409,108 @@ def create_admin(db: Session):
         admin_token = existing_admin.token
 
 
-def save_photos(photos: List[str], office_id: int) -> List[str]:
+def save_photos(db: Session, photos: List[str], existing: List[str] = ()) -> List[str]:
     photo_paths = []
-    photo_directory = f'photos/{office_id}'
 
-    if not os.path.exists(photo_directory):
-        os.makedirs(photo_directory)
-
-    for photo_base64 in photos:
-        try:
-            if photo_base64.startswith("data:image/"):
-                header, photo_data = photo_base64.split(",", 1)
-                if "jpeg" in header or "jpg" in header:
-                    photo_extension = "jpg"
-                elif "png" in header:
-                    photo_extension = "png"
-                elif "gif" in header:
-                    photo_extension = "gif"
-                else:
-                    photo_extension = "jpg"
-
-                photo_data = base64.b64decode(photo_data)
-
-                unique_filename = f"{uuid.uuid4()}.{photo_extension}"
-                photo_path = os.path.join(photo_directory, unique_filename).replace('\\', "/")
-                with open(photo_path, "wb") as photo_file:
-                    photo_file.write(photo_data)
-
-                photo_paths.append(photo_path)
-            else:
+    try:
+        for photo in photos:
+            if photo in existing:
+                photo_paths.append(photo)
+                continue
+            if not photo.startswith("data:image/"):
                 raise HTTPException(status_code=400, detail="Invalid photo format")
-        except Exception as e:
-            print(f"Error saving photo: {e}")
-            raise HTTPException(status_code=500, detail="Error saving photo")
+            try:
+                header, photo_data = photo.split(",", 1)
+                photo_paths.append(blocking(lambda: write_photo(base64.b64decode(photo_data))))
+            except PhotoError as e:
+                raise HTTPException(status_code=e.status_code, detail=str(e))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid photo format")
+    except Exception as e:
+        release_photos(db, [photo_path for photo_path in photo_paths if photo_path not in existing])
+        if isinstance(e, HTTPException):
+            raise
+        print(f"Error saving photo: {e}")
+        raise HTTPException(status_code=500, detail="Error saving photo")
 
     return photo_paths
 
-@app.get("/photos/{office_id}/{photo_filename}")
-async def get_photo(office_id: int, photo_filename: str):
-    return FileResponse(f"photos/{office_id}/{photo_filename}")
+
+def release_photos(db: Session, photo_paths: List[str]):
+    for photo_path in set(photo_paths):
+        if is_stored(photo_path):
+            continue
+        if db.query(models.Office.id).filter(models.Office.photos.op("@>")(literal([photo_path], ARRAY(Text)))).first() is None:
+            blocking(remove_photo, photo_path)
+
+
+def sweep_photos(db: Session) -> int:
+    cutoff = sweep_cutoff()
+    candidates = stale_photos(cutoff)
+    if not candidates:
+        return 0
+
+    referenced = set(db.execute(
+        select(func.unnest(models.Office.photos)).where(models.Office.photos.op("&&")(literal(candidates, ARRAY(Text))))
+    ).scalars().all())
+
+    removed = 0
+    for photo_path in candidates:
+        if photo_path not in referenced and is_stale(photo_path, cutoff):
+            remove_photo(photo_path)
+            removed += 1
+    return removed
+
+
+def sweep_photos_once() -> int:
+    db = SessionLocal()
+    try:
+        return sweep_photos(db)
+    finally:
+        db.close()
+
+
+async def sweep_photos_periodically():
+    while True:
+        await asyncio.sleep(PHOTO_SWEEP_INTERVAL)
+        try:
+            removed = await run_in_threadpool(sweep_photos_once)
+            if removed:
+                print(f"Removed {removed} unreferenced photos")
+        except Exception as e:
+            print(f"Error sweeping photos: {e}")
 
 @app.on_event("startup")
 def startup_event():
+    prepare_schema()
     db = SessionLocal()
     create_admin(db)
+    ensure_version(db)
+    ensure_version(db, OFFICE_VERSION)
     db.close()
+    register_fonts()
+
+@app.on_event("startup")
+async def start_application_events():
+    application_events.start(asyncio.get_running_loop())
 
-@app.post("/reg")
-async def register(user: RegUser, db: db_dependency):
+@app.on_event("startup")
+async def start_photo_sweep():
+    app.state.photo_sweep = asyncio.create_task(sweep_photos_periodically())
+
+@app.on_event("shutdown")
+async def stop_photo_sweep():
+    app.state.photo_sweep.cancel()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_pool()
+    report_jobs.shutdown()
+    application_events.stop()
+
+@app.post("/reg", response_model=Union[RegisteredUser, Detail])
+@db_route
+def register(user: RegUser, db: db_dependency):
     existing_user_email = db.query(models.User).filter(models.User.email == user.email).first()
     existing_user_tel = db.query(models.User).filter(models.User.tel == user.tel).first()
 
@@ -199,24 +529,29 @@ async def register(user: RegUser, db: db_dependency):
     password=user.password,
     admin=False,
     blocked=False,
-    offices=[],
     token=uuid.uuid4())
 
     db.add(db_user)
-    db.commit()
+    try:
+        bump_version(db)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return {"detail": "Пользователь с данной электронной почтой уже зарегистрирован"}
     db.refresh(db_user)
 
     return db_user
 
 
-@app.post("/login")
-async def login(login: Login, db: db_dependency):
+@app.post("/login", response_model=Union[LoginOut, Detail])
+@db_route
+def login(login: Login, db: db_dependency):
     existing_user = db.query(models.User).filter(models.User.email == login.email).first()
     if existing_user:
         if not existing_user.blocked:
             if existing_user.password == login.password:
                 role = "Admin" if existing_user.token == admin_token else "User"
-                return {"token": existing_user.token, "role": role}
+                return {"token": str(existing_user.token), "role": role}
             else:
                 return {"detail": "Неверный пароль"}
         else:
@@ -225,9 +560,10 @@ async def login(login: Login, db: db_dependency):
         return {"detail": "Пользователь не найден"}
 
 
-@app.get("/users/{token}")
-async def send_info(token: str, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+@app.get("/users/{token}", response_model=Union[UserOut, Detail])
+@db_route
+def send_info(token: str, db: db_dependency):
+    existing_user = db.query(*USER_COLUMNS).filter(models.User.token == token).first()
     if existing_user:
         return existing_user
     else:
@@ -235,49 +571,80 @@ async def send_info(token: str, db: db_dependency):
 
 
 @app.put("/users/{token}")
-async def update_user(token: str, user: UpdateUser, db: db_dependency):
+@db_route
+def update_user(token: str, user: UpdateUser, db: db_dependency):
     existing_user = db.query(models.User).filter(models.User.token == token).first()
     if not existing_user:
         return {"detail": "Пользователь не найден"}
 
-    for key, value in user.dict(exclude_unset=True).items():
+    for key, value in user.dict(exclude_unset=True, exclude_none=True).items():
         setattr(existing_user, key, value)
 
-    db.commit()
+    try:
+        bump_version(db)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return {"detail": "Пользователь с данной электронной почтой уже зарегистрирован"}
     db.refresh(existing_user)
+    user_cache.invalidate(token)
     return {"message": "Данные обновлены"}
 
 
 @app.delete("/users/{token}", dependencies=[Depends(verify_admin_token)])
-async def delete_user(token: str, db: db_dependency):
+@db_route
+def delete_user(token: str, db: db_dependency):
     existing_user = db.query(models.User).filter(models.User.token == token).first()
     if not existing_user:
         return {"detail": "Пользователь не найден"}
     db.delete(existing_user)
+    bump_version(db)
     db.commit()
+    user_cache.invalidate(token)
     return {"message": "Пользователь удалён"}
 
 
 @app.get("/office")
-async def get_offices(db: db_dependency):
-    offices = db.query(models.Office).all()
-    if len(offices) != 0:
-        return offices
-    else:
-        return {"message": "Офисов нет"}
+@db_route
+def get_offices(
+    db: read_db_dependency,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    def build():
+        if limit is not None or after_id is not None or fields is not None:
+            selected = parse_office_fields(fields)
+            return page_offices(office_query(db, selected), limit, after_id, selected)
+
+        offices = db.query(models.Office).all()
+        if len(offices) != 0:
+            return [office_summary(office) for office in offices]
+        else:
+            return {"message": "Офисов нет"}
+
+    return cached_offices(db, f"list:{limit}:{after_id}:{fields}", if_none_match, build)
 
 
 @app.get("/office/{office_id}")
-async def get_office(office_id: int, db: db_dependency):
-    existing_office = db.query(models.Office).filter(models.Office.id == office_id).first()
-    if existing_office:
-        return existing_office
-    else:
-        raise HTTPException(status_code=404, detail="Офис не найден")
+@db_route
+def get_office(office_id: int, db: read_db_dependency, if_none_match: Optional[str] = Header(None)):
+    def build():
+        existing_office = db.query(models.Office).filter(models.Office.id == office_id).first()
+        if existing_office:
+            return office_summary(existing_office)
+        else:
+            raise HTTPException(status_code=404, detail="Офис не найден")
+
+    return cached_offices(db, f"office:{office_id}", if_none_match, build)
 
 
-@app.post("/office", dependencies=[Depends(verify_admin_token)])
-async def create_office(office: Office, db: Session = Depends(get_db)):
+@app.post("/office", dependencies=[Depends(verify_admin_token)], response_model=OfficeOut)
+@db_route
+def create_office(office: Office, db: Session = Depends(get_session)):
+    photo_paths = save_photos(db, office.photos)
+
     try:
         new_office = models.Office(
             name=office.name,
@@ -287,42 +654,44 @@ async def create_office(office: Office, db: Session = Depends(get_db)):
             area=office.area,
             price=office.price,
             active=True,
-            photos=[]
+            photos=photo_paths
         )
         db.add(new_office)
+        bump_version(db)
+        version = bump_version(db, OFFICE_VERSION)
         db.commit()
         db.refresh(new_office)
-
-        try:
-            photo_paths = save_photos(office.photos, new_office.id)
-            new_office.photos = photo_paths
-            db.commit()
-            db.refresh(new_office)
-        except Exception as e:
-            db.delete(new_office)
-            db.commit()
-            raise HTTPException(status_code=500, detail="Error saving photos")
-
-        return new_office
+        offices_changed(version, [office_point(new_office)])
     except Exception as e:
+        db.rollback()
+        release_photos(db, photo_paths)
         print(f"Error creating office: {e}")
         raise HTTPException(status_code=500, detail="Error creating office")
 
+    blocking(schedule_derivatives, photo_paths)
+    return office_summary(new_office)
+
 
 @app.delete("/office/{office_id}", dependencies=[Depends(verify_admin_token)])
-async def delete_office(office_id: int, db: db_dependency):
+@db_route
+def delete_office(office_id: int, db: db_dependency):
     existing_office = db.query(models.Office).filter(models.Office.id == office_id).first()
     if not existing_office:
         raise HTTPException(status_code=404, detail="Офис не найден")
 
     photos_directory = os.path.join("photos", str(office_id))
+    photo_paths = list(existing_office.photos or [])
 
     db.delete(existing_office)
+    bump_version(db)
+    version = bump_version(db, OFFICE_VERSION)
     db.commit()
+    offices_changed(version, removed=[office_id])
+    release_photos(db, photo_paths)
 
     if os.path.exists(photos_directory):
         try:
-            shutil.rmtree(photos_directory)
+            blocking(shutil.rmtree, photos_directory)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Ошибка при удалении папки с фото: {e}")
 
@@ -330,19 +699,14 @@ async def delete_office(office_id: int, db: db_dependency):
 
 
 @app.put("/office/{office_id}", dependencies=[Depends(verify_admin_token)])
-async def update_office(office_id: int, office: Office, db: db_dependency):
+@db_route
+def update_office(office_id: int, office: Office, db: db_dependency):
     existing_office = db.query(models.Office).filter(models.Office.id == office_id).first()
     if not existing_office:
         raise HTTPException(status_code=404, detail="Офис не найден")
 
-    photo_directory = f'photos/{office_id}'
-    if os.path.exists(photo_directory):
-        shutil.rmtree(photo_directory)
-
-    try:
-        photo_paths = save_photos(office.photos, office_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error updating photos: {e}")
+    existing_photos = list(existing_office.photos or [])
+    photo_paths = save_photos(db, office.photos, existing_photos)
 
     for key, value in office.dict(exclude_unset=True).items():
         if key != 'photos':
@@ -350,89 +714,380 @@ async def update_office(office_id: int, office: Office, db: db_dependency):
 
     existing_office.photos = photo_paths
 
+    bump_version(db)
+    version = bump_version(db, OFFICE_VERSION)
     db.commit()
     db.refresh(existing_office)
+    offices_changed(version, [office_point(existing_office)])
+    release_photos(db, [photo_path for photo_path in existing_photos if photo_path not in photo_paths])
+    blocking(schedule_derivatives, photo_paths)
     return {"message": "Данные обновлены"}
 
 
+PHOTO_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+        }}},
+    }
+}
+
+
+@app.post("/office/{office_id}/photos", dependencies=[Depends(verify_admin_token)], openapi_extra=PHOTO_UPLOAD_BODY)
+async def upload_office_photos(office_id: int, request: Request, db: db_dependency):
+    def office_exists(session: Session) -> bool:
+        # End the transaction so no pooled connection is held while the body is read.
+        exists = session.get(models.Office, office_id) is not None
+        session.rollback()
+        return exists
+
+    if not await run_db(db, office_exists):
+        raise HTTPException(status_code=404, detail="Офис не найден")
+
+    upload = PhotoUpload(request.headers)
+    try:
+        photo_paths = await upload.parse(request.stream())
+    except PhotoError as e:
+        await run_db(db, lambda session: release_photos(session, upload.paths))
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    def attach_photos(session: Session):
+        office = session.get(models.Office, office_id)
+        if office is None:
+            session.rollback()
+            return None
+        office.photos = (office.photos or []) + photo_paths
+        version = bump_version(session, OFFICE_VERSION)
+        session.commit()
+        offices_changed(version)
+        return list(office.photos)
+
+    photos = await run_db(db, attach_photos)
+    if photos is None:
+        await run_db(db, lambda session: release_photos(session, photo_paths))
+        raise HTTPException(status_code=404, detail="Офис не найден")
+    await run_in_threadpool(schedule_derivatives, photo_paths)
+    return {"photos": photos, "photo_variants": [variant_paths(photo) for photo in photos]}
+
+
+@app.post("/office/import", dependencies=[Depends(verify_admin_token)])
+async def import_offices(db: db_dependency, offices: UploadFile = File(...), photos: Optional[UploadFile] = File(None)):
+    try:
+        parsed, errors = await run_in_threadpool(parse_offices, offices.file, offices.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    names = sorted({name for office in parsed.values() for name in office.photos})
+    stored, photo_errors = await run_in_threadpool(store_archive_photos, photos.file if photos else None, names)
+
+    rows = []
+    for number, office in parsed.items():
+        missing = [photo_errors[name] for name in office.photos if name in photo_errors]
+        if missing:
+            errors[number] = "; ".join(missing)
+            continue
+        rows.append((number, {
+            "name": office.name,
+            "address": office.address,
+            "options": office.options,
+            "description": office.description,
+            "area": office.area,
+            "price": office.price,
+            "active": True,
+            "photos": [stored[name] for name in office.photos],
+        }))
+
+    def insert_offices(session: Session) -> List[int]:
+        ids = []
+        statement = insert(models.Office).returning(models.Office.id, sort_by_parameter_order=True)
+        try:
+            for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                batch = [values for number, values in rows[start:start + IMPORT_BATCH_SIZE]]
+                ids.extend(session.execute(statement, batch).scalars().all())
+            if rows:
+                bump_version(session)
+                version = bump_version(session, OFFICE_VERSION)
+            session.commit()
+            if rows:
+                offices_changed(version, [
+                    (office_id, values["price"], values["area"], values["active"])
+                    for (number, values), office_id in zip(rows, ids)
+                ])
+        except Exception:
+            session.rollback()
+            release_photos(session, list(stored.values()))
+            raise
+
+        used = {path for number, values in rows for path in values["photos"]}
+        release_photos(session, [path for path in stored.values() if path not in used])
+        return ids
+
+    try:
+        ids = await run_db(db, insert_offices)
+    except Exception as e:
+        print(f"Error importing offices: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при импорте офисов")
+
+    await run_in_threadpool(schedule_derivatives, sorted({path for number, values in rows for path in values["photos"]}))
+
+    report = [{"row": number, "status": "created", "id": office_id} for (number, values), office_id in zip(rows, ids)]
+    report += [{"row": number, "status": "error", "detail": detail} for number, detail in errors.items()]
+    report.sort(key=lambda item: item["row"])
+    return {"created": len(ids), "failed": len(errors), "rows": report}
+
+
 @app.post("/user/{token}/favorite/{office_id}")
-async def add_favorite(office_id: int, token: str, db: db_dependency):
+@db_route
+def add_favorite(office_id: int, token: str, db: db_dependency):
 
     if token == admin_token:
         return {"message": "Администратор не может добавить офис в понравившиеся"}
 
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+    existing_user = get_cached_user(token, db)
     if not existing_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    existing_office = db.query(models.Office).filter(models.Office.id == office_id).first()
-    if not existing_office:
-        raise HTTPException(status_code=404, detail="Офис не найден")
-
-    if office_id not in existing_user.offices:
-        existing_user.offices = existing_user.offices + [office_id]
-        db.commit()
-        db.refresh(existing_user)
+    added = db.execute(
+        pg_insert(models.Favorite).from_select(
+            ["user_id", "office_id"],
+            select(literal(existing_user.id), models.Office.id).where(models.Office.id == office_id)
+        ).on_conflict_do_nothing()
+    ).rowcount
+    db.commit()
 
+    if added:
         return {"message": "Офис добавлен в понравившиеся"}
-    else:
-        return {"message": "Офис уже находится в понравившихся"}
+
+    if not db.query(models.Office.id).filter(models.Office.id == office_id).first():
+        raise HTTPException(status_code=404, detail="Офис не найден")
+    return {"message": "Офис уже находится в понравившихся"}
 
 
 @app.delete("/user/{token}/favorite/{office_id}")
-async def delete_favorite(token: str, office_id: int, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+@db_route
+def delete_favorite(token: str, office_id: int, db: db_dependency):
+    existing_user = get_cached_user(token, db)
 
     if not existing_user:
         return {"message": "Пользователь не найден"}
     else:
-        if office_id in existing_user.offices:
-            existing_user.offices = list(filter(lambda x: x != office_id, existing_user.offices))
-
-            db.commit()
-            db.refresh(existing_user)
+        removed = db.execute(
+            delete(models.Favorite).where(
+                models.Favorite.user_id == existing_user.id,
+                models.Favorite.office_id == office_id
+            )
+        ).rowcount
+        db.commit()
 
+        if removed:
             return {"message": "Офис удалён"}
         else:
             return {"message": "Офиса нет в добавленных"}
 
 
+def favorite_ids(db: Session, user_id: int) -> List[int]:
+    return [office_id for office_id, in db.query(models.Favorite.office_id).filter(
+        models.Favorite.user_id == user_id
+    ).order_by(models.Favorite.created_at, models.Favorite.office_id)]
+
+
 @app.get("/user/{token}/favorite")
-async def get_favorite(token: str, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+@db_route
+def get_favorite(token: str, db: db_dependency):
+    existing_user = get_cached_user(token, db)
     if not existing_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     else:
-        if len(existing_user.offices) != 0:
-            return existing_user.offices
+        offices = favorite_ids(db, existing_user.id)
+        if len(offices) != 0:
+            return offices
         else:
             return {"message": "Офисов нет"}
 
 
-@app.get("/applications", dependencies=[Depends(verify_admin_token)])
-async def get_applications(db: db_dependency):
-    applications = db.query(models.App).all()
+@app.get("/user/{token}/favorite/offices")
+@db_route
+def get_favorite_offices(token: str, db: db_dependency, fields: Optional[str] = None):
+    existing_user = get_cached_user(token, db)
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    selected = parse_office_fields(fields)
+    offices = office_query(db, selected).join(
+        models.Favorite, models.Favorite.office_id == models.Office.id
+    ).filter(
+        models.Favorite.user_id == existing_user.id
+    ).order_by(models.Favorite.created_at, models.Favorite.office_id).all()
+    if selected is not None:
+        favorite_offices = [office_row(office) for office in offices]
+    else:
+        favorite_offices = [office_summary(office) for office in offices]
+
+    if len(favorite_offices) != 0:
+        return favorite_offices
+    else:
+        return {"message": "Офисов нет"}
+
+
+@app.get("/office/{office_id}/favorites")
+@db_route
+def get_office_favorites(office_id: int, db: db_dependency):
+    if not db.query(models.Office.id).filter(models.Office.id == office_id).first():
+        raise HTTPException(status_code=404, detail="Офис не найден")
+
+    count = db.query(func.count()).select_from(models.Favorite).filter(models.Favorite.office_id == office_id).scalar()
+    return {"office_id": office_id, "favorites": count}
+
+
+@app.get("/applications", dependencies=[Depends(verify_admin_token)], response_model=Union[List[ApplicationOut], Message])
+@db_route
+def get_applications(db: db_dependency):
+    applications = db.query(*APPLICATION_COLUMNS).all()
     if len(applications) != 0:
         return applications
     else:
         return {"message": "Заявок нет"}
 
 
-@app.get("/user/{token}/applications")
-async def get_user_applications(token: str, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+def user_summary(user: models.User) -> dict:
+    return {
+        "id": user.id,
+        "lastName": user.lastName,
+        "firstName": user.firstName,
+        "tel": user.tel,
+        "email": user.email,
+        "blocked": user.blocked,
+    }
+
+
+def feed_cursor(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def pending_cursor(value: str) -> Tuple[int, int]:
+    # The pending feed cursor carries the rank of the last row, so it stays valid if that row changes status or is deleted.
+    rank, _, app_id = value.partition(":")
+    if rank not in ("0", "1"):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return int(rank), feed_cursor(app_id)
+
+
+@app.get("/applications/feed", dependencies=[Depends(verify_admin_token)])
+@db_route
+def get_applications_feed(
+    db: db_dependency,
+    status: Optional[int] = None,
+    sort: str = Query("pending", pattern="^(pending|id|-id)$"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    after_id: Optional[str] = None
+):
+    query = db.query(models.App).options(selectinload(models.App.user), selectinload(models.App.office))
+    if status is not None:
+        query = query.filter(models.App.status == status)
+
+    if sort == "pending":
+        rank = case((models.App.status == 1, 0), else_=1)
+        query = query.order_by(rank, models.App.id)
+        if after_id is not None:
+            query = query.filter(tuple_(rank, models.App.id) > tuple_(*pending_cursor(after_id)))
+    elif sort == "id":
+        after_id = feed_cursor(after_id)
+        query = query.order_by(models.App.id)
+        if after_id is not None:
+            query = query.filter(models.App.id > after_id)
+    else:
+        after_id = feed_cursor(after_id)
+        query = query.order_by(models.App.id.desc())
+        if after_id is not None:
+            query = query.filter(models.App.id < after_id)
+
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    applications = query.all()
+    next_cursor = None
+    if limit is not None and len(applications) > limit:
+        applications = applications[:limit]
+        last = applications[-1]
+        next_cursor = f"{0 if last.status == 1 else 1}:{last.id}" if sort == "pending" else last.id
+
+    items = [
+        {
+            "id": application.id,
+            "id_user": application.id_user,
+            "id_office": application.id_office,
+            "status": application.status,
+            "user": user_summary(application.user) if application.user else None,
+            "office": office_summary(application.office) if application.office else None,
+        }
+        for application in applications
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.get("/user/{token}/applications", response_model=Union[List[ApplicationOut], Message])
+@db_route
+def get_user_applications(token: str, db: db_dependency):
+    existing_user = get_cached_user(token, db)
     if not existing_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    applications = db.query(models.App).filter(models.App.id_user == existing_user.id).all()
+    applications = db.query(*APPLICATION_COLUMNS).filter(
+        models.App.id_user == existing_user.id
+    ).all()
     if not applications:
         return {"message": "Заявок нет"}
     return applications
 
 
+def application_event(kind: str, application) -> dict:
+    return {
+        "type": kind,
+        "id": application.id,
+        "id_user": application.id_user,
+        "id_office": application.id_office,
+        "status": application.status,
+    }
+
+
+@app.post("/applications/events/ticket")
+@db_route
+def issue_application_events_ticket(db: db_dependency, x_admin_token: Optional[str] = Header(None)):
+    if x_admin_token is not None and x_admin_token == str(admin_token):
+        user_id = None
+    else:
+        existing_user = get_cached_user(x_admin_token, db) if x_admin_token else None
+        if not existing_user:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        user_id = existing_user.id
+
+    return {"ticket": issue_ticket(str(admin_token), user_id), "expires_in": EVENTS_TICKET_TTL}
+
+
+@app.get("/applications/events")
+async def stream_application_events(ticket: str):
+    claims = read_ticket(str(admin_token), ticket)
+    if claims is None:
+        raise HTTPException(status_code=403, detail="Недействительный или просроченный билет")
+
+    return StreamingResponse(
+        event_stream(application_events.subscribe(claims["user"])),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/applications/{token}/{office_id}")
-async def create_application(token: str, office_id: int, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.token == token).first()
+@db_route
+def create_application(token: str, office_id: int, db: db_dependency):
+    existing_user = get_cached_user(token, db)
 
     if not existing_user:
         return {"detail": "Пользователь не найден"}
@@ -455,22 +1110,26 @@ async def create_application(token: str, office_id: int, db: db_dependency):
     )
 
     db.add(new_application)
+    db.flush()
+    application_events.publish(db, [application_event("created", new_application)])
+    bump_version(db)
     db.commit()
-    db.refresh(new_application)
 
     return {"detail": "Заявка отправлена"}
 
 
 @app.put("/applications/{app_id}/{status_id}")
-async def update_application(app_id: int, status_id: int, db: db_dependency):
-    exsisting_application = db.query(models.App).filter(models.App.id == app_id).first()
-    if not exsisting_application:
+@db_route
+def update_application(app_id: int, status_id: int, db: db_dependency):
+    updated = db.execute(
+        update(models.App).where(models.App.id == app_id).values(status=status_id).returning(*APPLICATION_COLUMNS)
+    ).first()
+    if not updated:
         raise HTTPException(status_code=404, detail="Заявка не найдена")
 
-    setattr(exsisting_application, "status", status_id)
-
+    application_events.publish(db, [application_event("updated", updated)])
+    bump_version(db)
     db.commit()
-    db.refresh(exsisting_application)
 
     if status_id == 0:
         return {"message": "Заявка отменена"}
@@ -478,31 +1137,68 @@ async def update_application(app_id: int, status_id: int, db: db_dependency):
         return {"message": "Заявка принята"}
 
 
+@app.put("/applications/status", dependencies=[Depends(verify_admin_token)])
+@db_route
+def update_applications_status(batch: ApplicationsStatus, db: db_dependency):
+    ids = list(dict.fromkeys(batch.ids))
+    selected = models.App.id == any_(literal(ids, ARRAY(Integer)))
+
+    statement = update(models.App).where(selected).values(status=batch.status).returning(*APPLICATION_COLUMNS)
+    if batch.only_status is not None:
+        statement = statement.where(models.App.status == batch.only_status)
+
+    rows = db.execute(statement).all()
+    application_events.publish(db, [application_event("updated", row) for row in rows])
+
+    updated = {row.id for row in rows}
+    existing = updated
+    if len(updated) != len(ids):
+        existing = set(db.execute(select(models.App.id).where(selected)).scalars().all())
+
+    if updated:
+        bump_version(db)
+    db.commit()
+
+    results = []
+    for app_id in ids:
+        if app_id in updated:
+            results.append({"id": app_id, "status": "updated"})
+        elif app_id in existing:
+            results.append({"id": app_id, "status": "skipped"})
+        else:
+            results.append({"id": app_id, "status": "not_found"})
+    return {"updated": len(updated), "results": results}
+
+
 @app.delete("/applications/{app_id}", dependencies=[Depends(verify_admin_token)])
-async def delete_application(app_id: int, db: db_dependency):
+@db_route
+def delete_application(app_id: int, db: db_dependency):
     existing_application = db.query(models.App).filter(models.App.id == app_id).first()
     if existing_application:
+        application_events.publish(db, [application_event("deleted", existing_application)])
         db.delete(existing_application)
+        bump_version(db)
         db.commit()
-        db.refresh(existing_application)
 
         return {"message": "Заявка удалена"}
     else:
         return {"message": "Заявка не найдена"}
 
 
-@app.get("/users", dependencies=[Depends(verify_admin_token)])
-async def get_users(db: db_dependency):
-    users = db.query(models.User).filter(models.User.admin == False).order_by(models.User.id).all()
+@app.get("/users", dependencies=[Depends(verify_admin_token)], response_model=Union[List[UserOut], Message])
+@db_route
+def get_users(db: read_db_dependency):
+    users = db.query(*USER_COLUMNS).filter(models.User.admin == False).order_by(models.User.id).all()
     if len(users) == 0:
         return {"message": "Пользователь нет"}
     else:
         return users
 
 
-@app.get("/users/id/{user_id}", dependencies=[Depends(verify_admin_token)])
-async def get_user(user_id: int, db: db_dependency):
-    existing_user = db.query(models.User).filter(models.User.id == user_id).first()
+@app.get("/users/id/{user_id}", dependencies=[Depends(verify_admin_token)], response_model=Union[UserOut, Message])
+@db_route
+def get_user(user_id: int, db: db_dependency):
+    existing_user = db.query(*USER_COLUMNS).filter(models.User.id == user_id).first()
 
     if not existing_user:
         return {"message": "Пользователь не найден"}
@@ -511,141 +1207,234 @@ async def get_user(user_id: int, db: db_dependency):
 
 
 @app.delete("/users/id/{user_id}", dependencies=[Depends(verify_admin_token)])
-async def delete_user(user_id: int, db: db_dependency):
+@db_route
+def delete_user(user_id: int, db: db_dependency):
     existing_user = db.query(models.User).filter(models.User.id == user_id).first()
 
     if not existing_user:
         return {"message": "Пользователь не найден"}
 
     db.delete(existing_user)
+    bump_version(db)
     db.commit()
+    user_cache.invalidate(existing_user.token)
 
     return {"message": "Пользователь удалён"}
 
 
 @app.put("/users/id/{user_id}", dependencies=[Depends(verify_admin_token)])
-async def update_user(user_id: int, user: UpdateUser, db: db_dependency):
+@db_route
+def update_user(user_id: int, user: UpdateUser, db: db_dependency):
     existing_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not existing_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    for key, value in user.dict(exclude_unset=True).items():
+    for key, value in user.dict(exclude_unset=True, exclude_none=True).items():
         setattr(existing_user, key, value)
 
-    db.commit()
+    try:
+        bump_version(db)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Пользователь с данной электронной почтой уже зарегистрирован")
     db.refresh(existing_user)
+    user_cache.invalidate(existing_user.token)
     return {"message": "Данные обновлены"}
 
 
+@app.get("/cache/stats", dependencies=[Depends(verify_admin_token)])
+async def get_cache_stats():
+    return {"users": user_cache.stats(), "office_index": office_index.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(metric_engines), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/office/search")
-async def search_office(search: SearchOffice, db: db_dependency):
-    search_office = db.query(models.Office).filter(models.Office.area >= search.minArea).filter(
-        models.Office.area <= search.maxArea).filter(models.Office.price >= search.minPrice).filter(
-        models.Office.price <= search.maxPrice).all()
+@db_route
+def search_office(
+    search: SearchOffice,
+    db: read_db_dependency,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    paged = limit is not None or after_id is not None or fields is not None
+    selected = parse_office_fields(fields) if paged else None
+
+    ids = office_index.columns(db, office_version(db)).search(
+        search.minArea, search.maxArea, search.minPrice, search.maxPrice, search.active,
+        after_id=after_id, limit=limit + 1 if limit is not None else None
+    )
+    search_office = office_query(db, selected).filter(models.Office.id == any_(literal(ids.tolist(), ARRAY(Integer))))
+
+    if paged:
+        return page_offices(search_office, limit, after_id, selected)
+
+    search_office = search_office.order_by(models.Office.id).all() if ids.size else []
 
     if search_office:
-        return search_office
+        return [office_summary(office) for office in search_office]
     else:
         return {"message": "По данным критериям офисов нет"}
 
-@app.get("/users/search/{phone}")
-async def search_users(phone: str, db: db_dependency):
+
+@app.post("/office/search/facets")
+@db_route
+def search_office_facets(
+    search: SearchOffice,
+    db: read_db_dependency,
+    buckets: int = Query(FACET_BUCKETS, ge=1, le=100)
+):
+    return office_index.columns(db, office_version(db)).facets(
+        search.minArea, search.maxArea, search.minPrice, search.maxPrice, search.active, buckets
+    )
+
+SEARCH_LIMIT = 50
+
+
+def search_order(column, query: str):
+    return [func.similarity(column, query).desc(), func.length(column)]
+
+
+@app.get("/users/search/{phone}", response_model=List[UserOut])
+@db_route
+def search_users(
+    phone: str,
+    db: read_db_dependency,
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=PAGE_MAX)
+):
     normalized_phone = phone.replace("-", "").replace(" ", "")
-    users = db.query(models.User).filter(models.User.admin == False).filter(
-        or_(
-            func.replace(func.replace(models.User.tel, '-', ''), ' ', '').like(f"%{normalized_phone}%")
-        )
-    ).all()
+    users = db.query(*USER_COLUMNS).filter(models.User.admin == False).filter(
+        models.User.tel_search.contains(normalized_phone, autoescape=True)
+    ).order_by(*search_order(models.User.tel_search, normalized_phone)).limit(limit).all()
     return users
 
-@app.get("/offices/search/{query}")
-async def search_offices(query: str, db: db_dependency):
+@app.get("/offices/search/{query}", response_model=List[OfficeOut])
+@db_route
+def search_offices(
+    query: str,
+    db: read_db_dependency,
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=PAGE_MAX)
+):
     normalized_query = query.replace("-", "").replace(" ", "").lower()
-    offices = db.query(models.Office).filter(
-        or_(
-            func.lower(func.replace(func.replace(models.Office.name, '-', ''), ' ', '')).like(f"%{normalized_query}%"),
-        )
-    ).all()
-    return offices
+    offices = db.query(models.Office).options(load_only(*OFFICE_SUMMARY_COLUMNS)).filter(
+        models.Office.name_search.contains(normalized_query, autoescape=True)
+    ).order_by(*search_order(models.Office.name_search, normalized_query)).limit(limit).all()
+    return [office_summary(office) for office in offices]
+
+EXPORT_FORMAT = Query("csv", pattern="^(csv|jsonl)$")
+
+
+@app.get("/export/users", dependencies=[Depends(verify_admin_token)])
+async def export_users(
+    format: str = EXPORT_FORMAT,
+    after_id: Optional[int] = None,
+    blocked: Optional[bool] = None
+):
+    statement = select(
+        models.User.id, models.User.lastName, models.User.firstName, models.User.tel,
+        models.User.age, models.User.email, models.User.blocked
+    ).filter(models.User.admin == False)
+    if after_id is not None:
+        statement = statement.filter(models.User.id > after_id)
+    if blocked is not None:
+        statement = statement.filter(models.User.blocked == blocked)
+    return export_response(statement.order_by(models.User.id), "users", format)
+
+
+@app.get("/export/offices", dependencies=[Depends(verify_admin_token)])
+async def export_offices(
+    format: str = EXPORT_FORMAT,
+    after_id: Optional[int] = None,
+    active: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None
+):
+    statement = select(
+        models.Office.id, models.Office.name, models.Office.address, models.Office.options,
+        models.Office.description, models.Office.area, models.Office.price, models.Office.active,
+        models.Office.photos
+    )
+    if after_id is not None:
+        statement = statement.filter(models.Office.id > after_id)
+    if active is not None:
+        statement = statement.filter(models.Office.active == active)
+    if min_price is not None:
+        statement = statement.filter(models.Office.price >= min_price)
+    if max_price is not None:
+        statement = statement.filter(models.Office.price <= max_price)
+    if min_area is not None:
+        statement = statement.filter(models.Office.area >= min_area)
+    if max_area is not None:
+        statement = statement.filter(models.Office.area <= max_area)
+    return export_response(statement.order_by(models.Office.id), "offices", format)
+
+
+@app.get("/export/applications", dependencies=[Depends(verify_admin_token)])
+async def export_applications(
+    format: str = EXPORT_FORMAT,
+    after_id: Optional[int] = None,
+    status: Optional[int] = None,
+    id_user: Optional[int] = None,
+    id_office: Optional[int] = None
+):
+    statement = select(*APPLICATION_COLUMNS)
+    if after_id is not None:
+        statement = statement.filter(models.App.id > after_id)
+    if status is not None:
+        statement = statement.filter(models.App.status == status)
+    if id_user is not None:
+        statement = statement.filter(models.App.id_user == id_user)
+    if id_office is not None:
+        statement = statement.filter(models.App.id_office == id_office)
+    return export_response(statement.order_by(models.App.id), "applications", format)
+
+
+def report_response(job) -> FileResponse:
+    return FileResponse(job.path, media_type="application/pdf", filename=job.filename)
+
+
+def find_report_job(job_id: str):
+    version = job_version(job_id)
+    return report_jobs.get(version) if version is not None else None
+
+
+@app.post("/export/report/jobs", dependencies=[Depends(verify_admin_token)])
+async def submit_report_job(db: db_dependency):
+    job = await run_in_threadpool(report_jobs.submit, await run_db(db, current_version))
+    return job.as_dict()
+
+
+@app.get("/export/report/jobs/{job_id}", dependencies=[Depends(verify_admin_token)])
+async def get_report_job(job_id: str):
+    job = find_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Отчёт не найден")
+    return job.as_dict()
+
+
+@app.get("/export/report/jobs/{job_id}/download", dependencies=[Depends(verify_admin_token)])
+async def download_report_job(job_id: str):
+    job = find_report_job(job_id)
+    if not job or job.status != "done":
+        raise HTTPException(status_code=404, detail="Отчёт не готов")
+    return report_response(job)
+
 
 @app.get("/export/report/pdf", dependencies=[Depends(verify_admin_token)])
-async def export_report_pdf(db: Session = Depends(get_db)):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H:%M:%S")
-
-    pdfmetrics.registerFont(TTFont('TimesNewRoman', 'TimesNewRomanRegular.ttf'))
-    pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', 'TimesNewRomanBold.ttf'))
-
-    c.setFont("TimesNewRoman-Bold", 18)
-    c.drawString(30, height - 30, f"Отчёт о системе {timestamp}")
-
-    c.setFont("TimesNewRoman-Bold", 14)
-    c.drawString(30, height - 60, "Общая информация о системе")
-
-    users = db.query(models.User).filter(models.User.admin == False).all()
-    offices = db.query(models.Office).all()
-    applications = db.query(models.App).all()
-
-    c.setFont("TimesNewRoman", 12)
-    c.drawString(30, height - 80, f"Количество зарегистрированных пользователей: {len(users)}")
-    c.drawString(30, height - 100, f"Количество офисов: {len(offices)}")
-    c.drawString(30, height - 120, f"Количество заявок: {len(applications)}")
-
-    c.setFont("TimesNewRoman-Bold", 14)
-    c.drawString(30, height - 160, "Информация о пользователях")
-
-    y = height - 180
-    c.setFont("TimesNewRoman", 12)
-    for user in users:
-        text = f"ID: {user.id}, Имя: {user.firstName}, Фамилия: {user.lastName}, Телефон: +{user.tel.replace('-', '')}, Email: {user.email}, Статус: {'Разблокирован' if not user.blocked else 'Заблокирован'}"
-        lines = simpleSplit(text, "TimesNewRoman", 12, width - 60)
-        for line in lines:
-            c.drawString(30, y, line)
-            y -= 20
-            if y < 50:
-                c.showPage()
-                y = height - 30
-                c.setFont("TimesNewRoman", 12)
-
-    c.setFont("TimesNewRoman-Bold", 14)
-    c.drawString(30, y - 40, "Информация об офисах")
-
-    y -= 60
-    c.setFont("TimesNewRoman", 12)
-    for office in offices:
-        text = f"ID: {office.id}, Название: {office.name}, Адрес: {office.address}, Цена: {office.price} BYN, Площадь: {office.area} м2, Статус: {'Активен' if office.active else 'Неактивен'}"
-        lines = simpleSplit(text, "TimesNewRoman", 12, width - 60)
-        for line in lines:
-            c.drawString(30, y, line)
-            y -= 20
-            if y < 50:
-                c.showPage()
-                y = height - 30
-                c.setFont("TimesNewRoman", 12)
-
-    c.setFont("TimesNewRoman-Bold", 14)
-    c.drawString(30, y - 40, "Информация о заявках")
-
-    y -= 60
-    c.setFont("TimesNewRoman", 12)
-    for app in applications:
-        text = f"ID: {app.id}, ID пользователя: {app.id_user}, ID офиса: {app.id_office}, Статус: {'В процессе' if app.status == 1 else 'Отменена' if app.status == 0 else 'Одобрена'}"
-        lines = simpleSplit(text, "TimesNewRoman", 12, width - 60)
-        for line in lines:
-            c.drawString(30, y, line)
-            y -= 20
-            if y < 50:
-                c.showPage()
-                y = height - 30
-                c.setFont("TimesNewRoman", 12)
-
-    c.save()
-    buffer.seek(0)
-    filename = f"report_{timestamp}.pdf"
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
+async def export_report_pdf(db: db_dependency):
+    version = await run_db(db, current_version)
+    await run_in_threadpool(report_jobs.submit, version)
+    job = await report_jobs.wait(version)
+    if job is None or job.status != "done":
+        raise HTTPException(status_code=500, detail="Ошибка при создании отчёта")
+    return report_response(job)
 
 if __name__ == '__main__':
     uvicorn.run("main:app", port=1480, host="0.0.0.0", reload=True)
@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats:
+    __slots__ = ("path", "statements", "db_time")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.statements = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Tuple[str, ...], extra: Tuple[str, ...] = ()) -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names + extra[:1], values + extra[1:])]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, labels)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels: str, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, ('le', bound))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {counts[-1]}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return "\n".join(lines)
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+route_statements = Histogram("db_statements_per_request", "SQL statements executed per request.", ("route",), COUNT_BUCKETS)
+route_db_time = Histogram("db_time_per_request_seconds", "Time spent in SQL per request.", ("route",))
+query_latency = Histogram("db_query_duration_seconds", "SQL statement latency.", ("engine",))
+slow_queries = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("engine",))
+pool_wait = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",))
+
+METRICS = (http_requests, http_latency, route_statements, route_db_time, query_latency, slow_queries, pool_wait)
+
+
+def instrument_engine(engine, name: str):
+    pool = engine.pool
+    original_do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return original_do_get()
+        finally:
+            pool_wait.observe(name, value=time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        query_latency.observe(name, value=elapsed)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_queries.inc(name)
+            print(f"Slow query ({elapsed * 1000:.1f} ms, {stats.path if stats else 'background'}): {' '.join(statement.split())}")
+
+
+def pool_gauges(engines: Dict[str, object]) -> str:
+    lines = []
+    for metric, documentation, read in (
+        ("db_pool_size", "Configured pool size.", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections currently checked out.", lambda pool: pool.checkedout()),
+        ("db_pool_overflow", "Connections opened beyond the pool size.", lambda pool: pool.overflow()),
+    ):
+        lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} gauge"]
+        for name, engine in engines.items():
+            pool = engine.pool
+            if hasattr(pool, "checkedout"):
+                lines.append(f'{metric}{{engine="{name}"}} {read(pool)}')
+    return "\n".join(lines)
+
+
+def render(engines: Dict[str, object]) -> str:
+    return "\n".join([metric.render() for metric in METRICS] + [pool_gauges(engines)]) + "\n"
+
+
+def route_template(app, scope) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])
+        token = _request_stats.set(stats)
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = route_template(scope["app"], scope)
+            http_requests.inc(scope["method"], route, status)
+            http_latency.observe(scope["method"], route, value=elapsed)
+            route_statements.observe(route, value=stats.statements)
+            route_db_time.observe(route, value=stats.db_time)
@@ -0,0 +1,73 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+The schema create_all built before migrations existed. Such databases are
+already at this revision: run `alembic stamp 0001` and `alembic upgrade head`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "User",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("lastName", sa.String(length=255), nullable=True),
+        sa.Column("firstName", sa.String(length=255), nullable=True),
+        sa.Column("tel", sa.String(length=20), nullable=True),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("email", sa.String(length=255), nullable=True),
+        sa.Column("password", sa.String(length=255), nullable=True),
+        sa.Column("admin", sa.Boolean(), nullable=True),
+        sa.Column("blocked", sa.Boolean(), nullable=True),
+        sa.Column("token", sa.String(length=255), nullable=True),
+        sa.Column("offices", postgresql.ARRAY(sa.Integer()), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    for column in ("id", "lastName", "firstName", "tel", "age", "email", "password", "admin", "blocked", "token", "offices"):
+        op.create_index(f"ix_User_{column}", "User", [column])
+
+    op.create_table(
+        "Office",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=True),
+        sa.Column("address", sa.String(length=255), nullable=True),
+        sa.Column("options", sa.Text(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("area", sa.DECIMAL(), nullable=True),
+        sa.Column("price", sa.DECIMAL(), nullable=True),
+        sa.Column("active", sa.Boolean(), nullable=True),
+        sa.Column("photos", postgresql.ARRAY(sa.Text()), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    for column in ("id", "name", "address", "options", "description", "area", "price", "active", "photos"):
+        op.create_index(f"ix_Office_{column}", "Office", [column])
+
+    op.create_table(
+        "Application",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_user", sa.Integer(), nullable=True),
+        sa.Column("id_office", sa.Integer(), nullable=True),
+        sa.Column("status", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["id_user"], ["User.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["id_office"], ["Office.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    for column in ("id", "id_user", "id_office", "status"):
+        op.create_index(f"ix_Application_{column}", "Application", [column])
+
+
+def downgrade():
+    op.drop_table("Application")
+    op.drop_table("Office")
+    op.drop_table("User")
@@ -0,0 +1,38 @@
+"""search columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 11:00:00
+
+Generated, normalized copies of User.tel and Office.name with pg_trgm GIN
+indexes for /users/search and /offices/search.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column("User", sa.Column(
+        "tel_search", sa.String(length=20), sa.Computed("replace(replace(tel, '-', ''), ' ', '')", persisted=True), nullable=True
+    ))
+    op.create_index("ix_User_tel_search_trgm", "User", ["tel_search"], postgresql_using="gin", postgresql_ops={"tel_search": "gin_trgm_ops"})
+
+    op.add_column("Office", sa.Column(
+        "name_search", sa.String(length=255), sa.Computed("lower(replace(replace(name, '-', ''), ' ', ''))", persisted=True), nullable=True
+    ))
+    op.create_index("ix_Office_name_search_trgm", "Office", ["name_search"], postgresql_using="gin", postgresql_ops={"name_search": "gin_trgm_ops"})
+
+
+def downgrade():
+    op.drop_index("ix_Office_name_search_trgm", table_name="Office")
+    op.drop_column("Office", "name_search")
+    op.drop_index("ix_User_tel_search_trgm", table_name="User")
+    op.drop_column("User", "tel_search")
@@ -0,0 +1,31 @@
+"""version counters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00
+
+Change counters for report artifacts ("data") and cached office responses
+("office").
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    version = op.create_table(
+        "Version",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.bulk_insert(version, [{"name": "data", "value": 0}, {"name": "office", "value": 0}])
+
+
+def downgrade():
+    op.drop_table("Version")
@@ -0,0 +1,55 @@
+"""favorite table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:00:00
+
+Moves User.offices into the Favorite table, keeping the order favourites
+were added in, and drops the array column.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "Favorite",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("office_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["User.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["office_id"], ["Office.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "office_id"),
+    )
+    op.create_index("ix_Favorite_office_id", "Favorite", ["office_id"])
+
+    op.execute('''
+        INSERT INTO "Favorite" (user_id, office_id, created_at)
+        SELECT "User".id, favorite.office_id, now() + favorite.position * interval '1 microsecond'
+        FROM "User"
+        CROSS JOIN LATERAL unnest("User".offices) WITH ORDINALITY AS favorite(office_id, position)
+        JOIN "Office" ON "Office".id = favorite.office_id
+        ON CONFLICT DO NOTHING
+    ''')
+    op.drop_column("User", "offices")
+
+
+def downgrade():
+    op.add_column("User", sa.Column("offices", postgresql.ARRAY(sa.Integer()), nullable=True))
+    op.create_index("ix_User_offices", "User", ["offices"])
+    op.execute('''
+        UPDATE "User" SET offices = favorites.office_ids
+        FROM (
+            SELECT user_id, array_agg(office_id ORDER BY created_at) AS office_ids
+            FROM "Favorite" GROUP BY user_id
+        ) AS favorites
+        WHERE "User".id = favorites.user_id
+    ''')
+    op.drop_table("Favorite")
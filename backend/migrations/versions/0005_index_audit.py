@@ -0,0 +1,77 @@
+"""index audit
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:00:00
+
+Keeps only the indexes the queries in main.py use: unique email and token,
+tel for registration, a partial index for the non-admin user listings,
+area/price ranges, a GIN index for photo reference checks, (id_user,
+id_office) for create_application and (status, id) for the applications
+feed. Single-column indexes on primary keys, Text columns, booleans and the
+photos array are dropped.
+
+The unique email index cannot be built while two accounts share an email.
+The upgrade checks for that first and stops with the duplicated addresses,
+which have to be merged or changed by hand; nothing is deleted
+automatically. Offline (--sql) runs skip the check.
+
+"""
+import sqlalchemy as sa
+from alembic import context, op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+DROPPED = {
+    "User": ("id", "lastName", "firstName", "age", "password", "admin", "blocked"),
+    "Office": ("id", "name", "address", "options", "description", "active", "photos"),
+    "Application": ("id", "id_user", "status"),
+}
+
+
+def check_duplicate_emails():
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT email FROM "User" WHERE email IS NOT NULL GROUP BY email HAVING count(*) > 1 ORDER BY email'
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Duplicate emails block the unique ix_User_email index: {', '.join(duplicates)}")
+
+
+def upgrade():
+    check_duplicate_emails()
+
+    for table, columns in DROPPED.items():
+        for column in columns:
+            op.drop_index(f"ix_{table}_{column}", table_name=table)
+
+    op.drop_index("ix_User_email", table_name="User")
+    op.drop_index("ix_User_token", table_name="User")
+    op.create_index("ix_User_email", "User", ["email"], unique=True)
+    op.create_index("ix_User_token", "User", ["token"], unique=True)
+    op.create_index("ix_User_id_not_admin", "User", ["id"], postgresql_where="admin = false")
+
+    op.create_index("ix_Office_photos_gin", "Office", ["photos"], postgresql_using="gin")
+
+    op.create_index("ix_Application_user_office", "Application", ["id_user", "id_office"])
+    op.create_index("ix_Application_status_id", "Application", ["status", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_Application_status_id", table_name="Application")
+    op.drop_index("ix_Application_user_office", table_name="Application")
+    op.drop_index("ix_Office_photos_gin", table_name="Office")
+    op.drop_index("ix_User_id_not_admin", table_name="User")
+
+    op.drop_index("ix_User_token", table_name="User")
+    op.drop_index("ix_User_email", table_name="User")
+    op.create_index("ix_User_email", "User", ["email"])
+    op.create_index("ix_User_token", "User", ["token"])
+
+    for table, columns in DROPPED.items():
+        for column in columns:
+            op.create_index(f"ix_{table}_{column}", table_name=table, columns=[column])
@@ -1,38 +1,73 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DECIMAL, ARRAY
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DECIMAL, ARRAY, DateTime, Computed, Index, DDL, event, func, false
+from sqlalchemy.orm import relationship, backref, deferred
 from database import Base
 
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class User(Base):
     __tablename__ = "User"
-    id = Column(Integer, primary_key=True, index=True)
-    lastName = Column(String(255), index=True)
-    firstName = Column(String(255), index=True)
+    id = Column(Integer, primary_key=True)
+    lastName = Column(String(255))
+    firstName = Column(String(255))
     tel = Column(String(20), index=True)
-    age = Column(Integer, index=True)
-    email = Column(String(255), index=True)
-    password = Column(String(255), index=True)
-    admin = Column(Boolean, default=False, index=True)
-    blocked = Column(Boolean, default=False, index=True)
-    token = Column(String(255), index=True)
-    offices = Column(ARRAY(Integer), index=True)
+    tel_search = deferred(Column(String(20), Computed("replace(replace(tel, '-', ''), ' ', '')", persisted=True)))
+    age = Column(Integer)
+    email = Column(String(255), unique=True, index=True)
+    password = Column(String(255))
+    admin = Column(Boolean, default=False)
+    blocked = Column(Boolean, default=False)
+    token = Column(String(255), unique=True, index=True)
     applications = relationship("App", backref="user", cascade="all, delete", passive_deletes=True)
+    favorites = relationship("Favorite", backref="user", cascade="all, delete", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_User_tel_search_trgm", "tel_search", postgresql_using="gin", postgresql_ops={"tel_search": "gin_trgm_ops"}),
+        Index("ix_User_id_not_admin", "id", postgresql_where=admin == false()),
+    )
 
 class Office(Base):
     __tablename__ = "Office"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), index=True)
-    address = Column(String(255), index=True)
-    options = Column(Text, index=True)
-    description = Column(Text, index=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255))
+    name_search = deferred(Column(String(255), Computed("lower(replace(replace(name, '-', ''), ' ', ''))", persisted=True)))
+    address = Column(String(255))
+    options = Column(Text)
+    description = Column(Text)
     area = Column(DECIMAL, index=True)
     price = Column(DECIMAL, index=True)
-    active = Column(Boolean, default=True, index=True)
-    photos = Column(ARRAY(Text), index=True)
+    active = Column(Boolean, default=True)
+    photos = Column(ARRAY(Text))
     applications = relationship("App", backref="office", cascade="all, delete", passive_deletes=True)
+    favorites = relationship("Favorite", backref="office", cascade="all, delete", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_Office_name_search_trgm", "name_search", postgresql_using="gin", postgresql_ops={"name_search": "gin_trgm_ops"}),
+        Index("ix_Office_photos_gin", "photos", postgresql_using="gin"),
+    )
 
 class App(Base):
     __tablename__ = "Application"
-    id = Column(Integer, primary_key=True, index=True)
-    id_user = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"), index=True)
+    id = Column(Integer, primary_key=True)
+    id_user = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"))
     id_office = Column(Integer, ForeignKey("Office.id", ondelete="CASCADE"), index=True)
-    status = Column(Integer, index=True)
+    status = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_Application_user_office", "id_user", "id_office"),
+        Index("ix_Application_status_id", "status", "id"),
+    )
+
+class Favorite(Base):
+    __tablename__ = "Favorite"
+    user_id = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"), primary_key=True)
+    office_id = Column(Integer, ForeignKey("Office.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class Version(Base):
+    __tablename__ = "Version"
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
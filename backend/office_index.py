@@ -0,0 +1,122 @@
+import os
+import threading
+
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+import models
+
+FACET_BUCKETS = int(os.getenv("FACET_BUCKETS", "10"))
+
+OfficePoint = Tuple[int, object, object, Optional[bool]]
+
+
+def as_float(values) -> np.ndarray:
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+def histogram(values: np.ndarray, bounds: np.ndarray, buckets: int) -> dict:
+    if not bounds.size:
+        return {"edges": [], "counts": []}
+    counts, edges = np.histogram(values, bins=buckets, range=(bounds.min(), bounds.max()))
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+class OfficeColumns(NamedTuple):
+    version: int
+    ids: np.ndarray
+    price: np.ndarray
+    area: np.ndarray
+    active: np.ndarray
+
+    @classmethod
+    def from_points(cls, version: int, points: Iterable[OfficePoint]) -> "OfficeColumns":
+        points = list(points)
+        return cls(
+            version=version,
+            ids=np.array([point[0] for point in points], dtype=np.int64),
+            price=as_float(point[1] for point in points),
+            area=as_float(point[2] for point in points),
+            active=np.array([bool(point[3]) for point in points], dtype=bool),
+        )
+
+    def patched(self, version: int, upserted: Iterable[OfficePoint], removed: Iterable[int]) -> "OfficeColumns":
+        added = OfficeColumns.from_points(version, upserted)
+        keep = ~np.isin(self.ids, np.concatenate([np.asarray(list(removed), dtype=np.int64), added.ids]))
+        ids = np.concatenate([self.ids[keep], added.ids])
+        order = np.argsort(ids, kind="stable")
+        return OfficeColumns(
+            version=version,
+            ids=ids[order],
+            price=np.concatenate([self.price[keep], added.price])[order],
+            area=np.concatenate([self.area[keep], added.area])[order],
+            active=np.concatenate([self.active[keep], added.active])[order],
+        )
+
+    def masks(self, min_area: float, max_area: float, min_price: float, max_price: float,
+              active: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        area = (self.area >= min_area) & (self.area <= max_area)
+        price = (self.price >= min_price) & (self.price <= max_price)
+        scope = np.ones(self.ids.size, dtype=bool) if active is None else self.active == active
+        return area, price, scope
+
+    def search(self, min_area: float, max_area: float, min_price: float, max_price: float,
+               active: Optional[bool] = None, after_id: Optional[int] = None, limit: Optional[int] = None) -> np.ndarray:
+        area, price, scope = self.masks(min_area, max_area, min_price, max_price, active)
+        ids = self.ids[area & price & scope]
+        if after_id is not None:
+            ids = ids[np.searchsorted(ids, after_id, side="right"):]
+        return ids if limit is None else ids[:limit]
+
+    def facets(self, min_area: float, max_area: float, min_price: float, max_price: float,
+               active: Optional[bool] = None, buckets: int = FACET_BUCKETS) -> dict:
+        area, price, scope = self.masks(min_area, max_area, min_price, max_price, active)
+        known_price = self.price[scope & ~np.isnan(self.price)]
+        known_area = self.area[scope & ~np.isnan(self.area)]
+        return {
+            "count": int(np.count_nonzero(area & price & scope)),
+            "price": histogram(self.price[area & scope], known_price, buckets),
+            "area": histogram(self.area[price & scope], known_area, buckets),
+        }
+
+
+class OfficeRangeIndex:
+    def __init__(self):
+        self._columns: Optional[OfficeColumns] = None
+        self._lock = threading.Lock()
+
+    def columns(self, db, version: int) -> OfficeColumns:
+        columns = self._columns
+        if columns is not None and columns.version >= version:
+            return columns
+
+        with self._lock:
+            columns = self._columns
+            if columns is None or columns.version < version:
+                columns = self._columns = self.load(db, version)
+        return columns
+
+    def load(self, db, version: int) -> OfficeColumns:
+        rows = db.execute(
+            select(models.Office.id, models.Office.price, models.Office.area, models.Office.active).order_by(models.Office.id)
+        ).all()
+        return OfficeColumns.from_points(version, rows)
+
+    def apply(self, version: int, upserted: Iterable[OfficePoint] = (), removed: Iterable[int] = ()):
+        with self._lock:
+            columns = self._columns
+            if columns is None or columns.version != version - 1:
+                self._columns = None
+                return
+            self._columns = columns.patched(version, upserted, removed)
+
+    def stats(self) -> dict:
+        columns = self._columns
+        if columns is None:
+            return {"size": 0, "version": None}
+        return {"size": int(columns.ids.size), "version": columns.version}
+
+
+office_index = OfficeRangeIndex()
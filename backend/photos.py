@@ -0,0 +1,468 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import tempfile
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import anyio
+import multipart
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from PIL import Image, ImageOps
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+
+PHOTO_STORE = "photos/store"
+
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))
+
+PHOTO_CHUNK_SIZE = 64 * 1024
+
+PHOTO_VARIANTS = {"thumb": 320, "medium": 1024}
+
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+
+PHOTO_SWEEP_INTERVAL = int(os.getenv("PHOTO_SWEEP_INTERVAL", str(60 * 60)))
+PHOTO_SWEEP_GRACE = int(os.getenv("PHOTO_SWEEP_GRACE", str(60 * 60)))
+
+PHOTO_ACCEL_MODE = os.getenv("PHOTO_ACCEL_MODE", "")
+PHOTO_ACCEL_PREFIX = os.getenv("PHOTO_ACCEL_PREFIX", "/protected-photos/")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+LEGACY_CACHE = "public, max-age=86400"
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_pool = None
+
+
+class PhotoError(Exception):
+    status_code = 400
+
+
+class PhotoTooLarge(PhotoError):
+    status_code = 413
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def content_path(digest: str, extension: str) -> str:
+    os.makedirs(os.path.join(PHOTO_STORE, digest[:2]), exist_ok=True)
+    return f"{PHOTO_STORE}/{digest[:2]}/{digest}.{extension}"
+
+
+def write_photo(data: bytes) -> str:
+    extension = sniff_image_type(data[:16])
+    if extension is None:
+        raise PhotoError("Неподдерживаемый формат фото")
+    if len(data) > PHOTO_MAX_BYTES:
+        raise PhotoTooLarge("Фото превышает допустимый размер")
+
+    photo_path = content_path(hashlib.sha256(data).hexdigest(), extension)
+    if touch(photo_path):
+        return photo_path
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(photo_path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as photo_file:
+            photo_file.write(data)
+        os.replace(temp_path, photo_path)
+        return photo_path
+    except BaseException:
+        discard(temp_path)
+        raise
+
+
+class PhotoWriter:
+    def __init__(self, filename: str = ""):
+        self.filename = filename
+        self.size = 0
+        self._head = b""
+        self._extension = None
+        self._digest = hashlib.sha256()
+        self._file = None
+        self._temp_path = None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > PHOTO_MAX_BYTES:
+            raise PhotoTooLarge("Фото превышает допустимый размер")
+        if self._extension is None:
+            self._head += data
+            if len(self._head) < 16:
+                return
+            data, self._head = self._head, b""
+            self._sniff(data)
+        self._append(data)
+
+    def _sniff(self, head: bytes):
+        self._extension = sniff_image_type(head[:16])
+        if self._extension is None:
+            raise PhotoError("Неподдерживаемый формат фото")
+
+    def _append(self, data: bytes):
+        if self._file is None:
+            os.makedirs(PHOTO_STORE, exist_ok=True)
+            fd, self._temp_path = tempfile.mkstemp(dir=PHOTO_STORE, suffix=".part")
+            self._file = os.fdopen(fd, "wb")
+        self._digest.update(data)
+        self._file.write(data)
+
+    def finish(self) -> str:
+        if self._extension is None:
+            self._sniff(self._head)
+            self._append(self._head)
+        self._file.close()
+
+        photo_path = content_path(self._digest.hexdigest(), self._extension)
+        if touch(photo_path):
+            discard(self._temp_path)
+        else:
+            os.replace(self._temp_path, photo_path)
+        self._temp_path = None
+        return photo_path
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+        if self._temp_path is not None:
+            discard(self._temp_path)
+            self._temp_path = None
+
+
+def store_upload(source: BinaryIO) -> str:
+    writer = PhotoWriter()
+    try:
+        while chunk := source.read(PHOTO_CHUNK_SIZE):
+            writer.write(chunk)
+        return writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+class PhotoUpload:
+    """Parses a multipart body as it arrives and writes each file part straight into the photo store."""
+
+    def __init__(self, headers: Headers):
+        self.headers = headers
+        self.paths: List[str] = []
+        self._writer: Optional[PhotoWriter] = None
+        self._writers: List[PhotoWriter] = []
+        self._pending: List[Tuple[PhotoWriter, Optional[bytes]]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self):
+        self._writer = None
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"filename" in options:
+            self._writer = PhotoWriter(options[b"filename"].decode("utf-8", "replace"))
+            self._writers.append(self._writer)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._writer is not None:
+            self._pending.append((self._writer, data[start:end]))
+
+    def on_part_end(self):
+        if self._writer is not None:
+            self._pending.append((self._writer, None))
+
+    def flush(self, pending: List[Tuple[PhotoWriter, Optional[bytes]]]):
+        for writer, data in pending:
+            try:
+                if data is None:
+                    self.paths.append(writer.finish())
+                else:
+                    writer.write(data)
+            except PhotoError as e:
+                raise type(e)(f"{writer.filename}: {e}") from e
+
+    async def parse(self, stream) -> List[str]:
+        _, params = parse_options_header(self.headers.get("content-type", ""))
+        if b"boundary" not in params:
+            raise PhotoError("Ожидается multipart/form-data")
+
+        parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        })
+        try:
+            async for chunk in stream:
+                parser.write(chunk)
+                if self._pending:
+                    pending, self._pending = self._pending, []
+                    await anyio.to_thread.run_sync(self.flush, pending)
+            parser.finalize()
+        except MultipartParseError:
+            await anyio.to_thread.run_sync(self.abort)
+            raise PhotoError("Некорректное multipart-тело запроса")
+        except BaseException:
+            await anyio.to_thread.run_sync(self.abort)
+            raise
+
+        if not self.paths:
+            raise PhotoError("Фото не переданы")
+        return self.paths
+
+    def abort(self):
+        for writer in self._writers:
+            writer.abort()
+
+
+def remove_photo(photo_path: str):
+    discard(photo_path)
+    for path in variant_paths(photo_path).values():
+        discard(path)
+
+
+def touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def is_stored(photo_path: str) -> bool:
+    return photo_path.startswith(PHOTO_STORE + "/")
+
+
+def stale_photos(cutoff: float) -> List[str]:
+    photo_paths = []
+    for directory, _, names in os.walk(PHOTO_STORE):
+        for name in names:
+            path = f"{directory}/{name}"
+            if is_stale(path, cutoff):
+                if name.endswith(".part"):
+                    discard(path)
+                elif not is_derivative(path):
+                    photo_paths.append(path)
+    return photo_paths
+
+
+def is_stale(path: str, cutoff: float) -> bool:
+    try:
+        return os.path.getmtime(path) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def sweep_cutoff() -> float:
+    return time.time() - PHOTO_SWEEP_GRACE
+
+
+def discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_derivative(path: str) -> bool:
+    return os.path.basename(path).count(".") > 1
+
+
+def variant_paths(photo_path: str) -> Dict[str, str]:
+    stem, _ = os.path.splitext(photo_path)
+    paths = {}
+    for variant in PHOTO_VARIANTS:
+        paths[variant] = f"{stem}.{variant}.jpg"
+        paths[f"{variant}_webp"] = f"{stem}.{variant}.webp"
+    return paths
+
+
+def make_derivatives(photo_path: str) -> Dict[str, str]:
+    paths = variant_paths(photo_path)
+    directory = os.path.dirname(photo_path)
+    with Image.open(photo_path) as source:
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    for variant, size in PHOTO_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size))
+        for key, image_format, options in (
+            (variant, "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+            (f"{variant}_webp", "WEBP", {"quality": 80, "method": 4}),
+        ):
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as photo_file:
+                    resized.save(photo_file, image_format, **options)
+                os.replace(temp_path, paths[key])
+            except BaseException:
+                discard(temp_path)
+                raise
+
+    return paths
+
+
+def schedule_derivatives(photo_paths: List[str]):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+
+    for photo_path in photo_paths:
+        if all(os.path.exists(path) for path in variant_paths(photo_path).values()):
+            continue
+        _pool.submit(make_derivatives, photo_path).add_done_callback(_report_failure)
+
+
+def _report_failure(future):
+    if future.exception() is not None:
+        print(f"Error creating photo derivatives: {future.exception()}")
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def single_range(value: str) -> Optional[Tuple[str, str]]:
+    match = RANGE_PATTERN.match(value.strip())
+    if match is None or match.group(0) == "bytes=-":
+        return None
+    return match.groups()
+
+
+def requested_range(value: Tuple[str, str], size: int) -> Optional[Tuple[int, int]]:
+    start, end = value
+    if not start:
+        length = int(end)
+        return (max(size - length, 0), size - 1) if length else None
+    end = min(int(end), size - 1) if end else size - 1
+    return (int(start), end) if int(start) <= end else None
+
+
+async def read_range(path: str, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as photo_file:
+        await photo_file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await photo_file.read(min(PHOTO_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class PhotoFiles(StaticFiles):
+    def negotiate(self, full_path: str, stat_result: os.stat_result, headers: Headers):
+        if not (is_derivative(full_path) and full_path.endswith(".jpg")):
+            return full_path, stat_result, False
+        if "image/webp" not in headers.get("accept", ""):
+            return full_path, stat_result, True
+
+        webp_path = full_path[:-len(".jpg")] + ".webp"
+        try:
+            return webp_path, os.stat(webp_path), True
+        except OSError:
+            return full_path, stat_result, True
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        full_path, stat_result, negotiated = self.negotiate(str(full_path), stat_result, request_headers)
+
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        in_store = os.path.abspath(full_path).startswith(os.path.abspath(PHOTO_STORE) + os.sep)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE if in_store else LEGACY_CACHE
+        response.headers["Accept-Ranges"] = "bytes"
+        if negotiated:
+            response.headers["Vary"] = "Accept"
+        if response.status_code == 304:
+            return response
+
+        if PHOTO_ACCEL_MODE:
+            return self.accel_response(full_path, response)
+
+        byte_range = single_range(request_headers.get("range", ""))
+        if_range = request_headers.get("if-range")
+        if byte_range and (if_range is None or if_range == response.headers["etag"]):
+            return self.range_response(full_path, stat_result.st_size, byte_range, response, scope)
+        return response
+
+    def accel_response(self, full_path: str, response: Response) -> Response:
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+        if PHOTO_ACCEL_MODE == "sendfile":
+            headers["X-Sendfile"] = os.path.abspath(full_path)
+        else:
+            headers["X-Accel-Redirect"] = PHOTO_ACCEL_PREFIX.rstrip("/") + "/" + relative_path
+        return Response(headers=headers)
+
+    def range_response(self, full_path: str, size: int, requested: Tuple[str, str], response: Response, scope) -> Response:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+        byte_range = requested_range(requested, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if scope["method"] == "HEAD":
+            return Response(status_code=206, headers=headers)
+        return StreamingResponse(read_range(full_path, start, end), status_code=206, headers=headers)
+
+
+def backfill(root: str = "photos"):
+    originals = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            photo_path = os.path.join(directory, filename).replace("\\", "/")
+            if is_derivative(photo_path) or filename.endswith(".part"):
+                continue
+            if not all(os.path.exists(path) for path in variant_paths(photo_path).values()):
+                originals.append(photo_path)
+
+    with ProcessPoolExecutor(max_workers=PHOTO_WORKERS) as pool:
+        for photo_path, result in zip(originals, pool.map(make_derivatives, originals)):
+            print(f"{photo_path}: {len(result)} variants")
+
+    print(f"Processed {len(originals)} photos")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["backfill"]:
+        backfill(*sys.argv[2:3])
+    else:
+        print("Usage: python photos.py backfill [photos_directory]")
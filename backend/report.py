@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from datetime import datetime
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase import pdfmetrics
+
+from sqlalchemy import func
+
+import models
+from database import ReadSessionLocal
+from photos import discard, touch
+
+REPORT_BATCH_SIZE = 1000
+
+REPORTS_PATH = "reports"
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_KEEP = int(os.getenv("REPORT_KEEP", "5"))
+REPORT_MAX_AGE = int(os.getenv("REPORT_MAX_AGE", str(24 * 60 * 60)))
+REPORT_HEARTBEAT = float(os.getenv("REPORT_HEARTBEAT", "5"))
+REPORT_STALE_AFTER = float(os.getenv("REPORT_STALE_AFTER", "30"))
+REPORT_POLL_INTERVAL = 0.2
+
+_fonts_registered = False
+
+
+def register_fonts():
+    global _fonts_registered
+    if _fonts_registered:
+        return
+
+    pdfmetrics.registerFont(TTFont('TimesNewRoman', 'TimesNewRomanRegular.ttf'))
+    pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', 'TimesNewRomanBold.ttf'))
+    _fonts_registered = True
+
+
+def draw_rows(c: canvas.Canvas, y: float, lines):
+    width, height = A4
+    c.setFont("TimesNewRoman", 12)
+    for text in lines:
+        for line in simpleSplit(text, "TimesNewRoman", 12, width - 60):
+            c.drawString(30, y, line)
+            y -= 20
+            if y < 50:
+                c.showPage()
+                y = height - 30
+                c.setFont("TimesNewRoman", 12)
+    return y
+
+
+def user_lines(db):
+    users = db.query(
+        models.User.id, models.User.firstName, models.User.lastName,
+        models.User.tel, models.User.email, models.User.blocked
+    ).filter(models.User.admin == False).order_by(models.User.id).yield_per(REPORT_BATCH_SIZE)
+    for user in users:
+        yield f"ID: {user.id}, Имя: {user.firstName}, Фамилия: {user.lastName}, Телефон: +{user.tel.replace('-', '')}, Email: {user.email}, Статус: {'Разблокирован' if not user.blocked else 'Заблокирован'}"
+
+
+def office_lines(db):
+    offices = db.query(
+        models.Office.id, models.Office.name, models.Office.address,
+        models.Office.price, models.Office.area, models.Office.active
+    ).order_by(models.Office.id).yield_per(REPORT_BATCH_SIZE)
+    for office in offices:
+        yield f"ID: {office.id}, Название: {office.name}, Адрес: {office.address}, Цена: {office.price} BYN, Площадь: {office.area} м2, Статус: {'Активен' if office.active else 'Неактивен'}"
+
+
+def application_lines(db):
+    applications = db.query(
+        models.App.id, models.App.id_user, models.App.id_office, models.App.status
+    ).order_by(models.App.id).yield_per(REPORT_BATCH_SIZE)
+    for app in applications:
+        yield f"ID: {app.id}, ID пользователя: {app.id_user}, ID офиса: {app.id_office}, Статус: {'В процессе' if app.status == 1 else 'Отменена' if app.status == 0 else 'Одобрена'}"
+
+
+def render_report(path: str, timestamp: str):
+    register_fonts()
+    width, height = A4
+    c = canvas.Canvas(path, pagesize=A4)
+
+    db = ReadSessionLocal()
+    try:
+        c.setFont("TimesNewRoman-Bold", 18)
+        c.drawString(30, height - 30, f"Отчёт о системе {timestamp}")
+
+        c.setFont("TimesNewRoman-Bold", 14)
+        c.drawString(30, height - 60, "Общая информация о системе")
+
+        users_count = db.query(func.count(models.User.id)).filter(models.User.admin == False).scalar()
+        offices_count = db.query(func.count(models.Office.id)).scalar()
+        applications_count = db.query(func.count(models.App.id)).scalar()
+
+        c.setFont("TimesNewRoman", 12)
+        c.drawString(30, height - 80, f"Количество зарегистрированных пользователей: {users_count}")
+        c.drawString(30, height - 100, f"Количество офисов: {offices_count}")
+        c.drawString(30, height - 120, f"Количество заявок: {applications_count}")
+
+        c.setFont("TimesNewRoman-Bold", 14)
+        c.drawString(30, height - 160, "Информация о пользователях")
+
+        y = draw_rows(c, height - 180, user_lines(db))
+
+        c.setFont("TimesNewRoman-Bold", 14)
+        c.drawString(30, y - 40, "Информация об офисах")
+
+        y = draw_rows(c, y - 60, office_lines(db))
+
+        c.setFont("TimesNewRoman-Bold", 14)
+        c.drawString(30, y - 40, "Информация о заявках")
+
+        draw_rows(c, y - 60, application_lines(db))
+    finally:
+        db.close()
+
+    c.save()
+
+
+def artifact_path(version: int) -> str:
+    return os.path.join(REPORTS_PATH, f"report_v{version}.pdf")
+
+
+def state_path(version: int) -> str:
+    return os.path.join(REPORTS_PATH, f"report_v{version}.json")
+
+
+def job_version(job_id: str) -> Optional[int]:
+    if job_id.startswith("v") and job_id[1:].isdigit():
+        return int(job_id[1:])
+    return None
+
+
+def write_state(version: int, status: str, error: Optional[str] = None):
+    os.makedirs(REPORTS_PATH, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=REPORTS_PATH, suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as state_file:
+            json.dump({"status": status, "error": error}, state_file)
+        os.replace(temp_path, state_path(version))
+    except BaseException:
+        discard(temp_path)
+        raise
+
+
+def read_state(version: int) -> Optional[dict]:
+    try:
+        with open(state_path(version)) as state_file:
+            state = json.load(state_file)
+            state["updated"] = os.fstat(state_file.fileno()).st_mtime
+            return state
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class ReportJob:
+    def __init__(self, version: int, status: str, error: Optional[str] = None, timestamp: Optional[str] = None,
+                 stale: bool = False):
+        self.version = version
+        self.status = status
+        self.error = error
+        self.timestamp = timestamp
+        self.stale = stale
+
+    @property
+    def id(self) -> str:
+        return f"v{self.version}"
+
+    @property
+    def path(self) -> str:
+        return artifact_path(self.version)
+
+    @property
+    def filename(self) -> str:
+        return f"report_{self.timestamp}.pdf"
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "version": self.version, "status": self.status, "error": self.error}
+
+
+class ReportJobs:
+    """Report jobs keyed by data version; their state lives in REPORTS_PATH so every worker can answer for them.
+
+    The worker that owns a job touches its state file every REPORT_HEARTBEAT seconds. A queued or running state
+    that has not been touched for REPORT_STALE_AFTER seconds belonged to a worker that died, and submit takes it over.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._heartbeat = None
+        self._stopped = threading.Event()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, version: int) -> Optional[ReportJob]:
+        try:
+            timestamp = datetime.fromtimestamp(os.path.getmtime(artifact_path(version))).strftime("%Y-%m-%d-%H:%M:%S")
+            return ReportJob(version, "done", timestamp=timestamp)
+        except FileNotFoundError:
+            pass
+
+        state = read_state(version)
+        if state is None:
+            return None
+        if state["status"] != "failed" and time.time() - state["updated"] > REPORT_STALE_AFTER:
+            return ReportJob(version, "failed", "Отчёт не был создан вовремя", stale=True)
+        return ReportJob(version, state["status"], state.get("error"))
+
+    def submit(self, version: int) -> ReportJob:
+        with self._lock:
+            job = self.get(version)
+            if job is not None and job.status != "failed":
+                return job
+
+            write_state(version, "queued")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+            if self._heartbeat is None:
+                self._stopped.clear()
+                self._heartbeat = threading.Thread(target=self._beat, name="report-heartbeat", daemon=True)
+                self._heartbeat.start()
+            self._futures[version] = self._executor.submit(self._run, version)
+        return ReportJob(version, "queued")
+
+    async def wait(self, version: int) -> Optional[ReportJob]:
+        while True:
+            future = self._futures.get(version)
+            if future is not None:
+                try:
+                    await asyncio.wrap_future(future)
+                except Exception:
+                    pass
+
+            job = self.get(version)
+            if job is not None and job.stale:
+                await asyncio.to_thread(self.submit, version)
+                continue
+            if job is None or job.status in ("done", "failed"):
+                return job
+            await asyncio.sleep(REPORT_POLL_INTERVAL)
+
+    def _beat(self):
+        while not self._stopped.wait(REPORT_HEARTBEAT):
+            for version in list(self._futures):
+                touch(state_path(version))
+
+    def _run(self, version: int):
+        try:
+            write_state(version, "running")
+            fd, temp_path = tempfile.mkstemp(dir=REPORTS_PATH, suffix=".part")
+            os.close(fd)
+            try:
+                render_report(temp_path, datetime.now().strftime("%Y-%m-%d-%H:%M:%S"))
+                os.replace(temp_path, artifact_path(version))
+            except Exception as e:
+                discard(temp_path)
+                write_state(version, "failed", str(e))
+                print(f"Error generating report: {e}")
+                raise
+            discard(state_path(version))
+        finally:
+            with self._lock:
+                self._futures.pop(version, None)
+
+        executor = self._executor
+        if executor is not None:
+            try:
+                executor.submit(self.evict)
+            except RuntimeError:
+                pass
+
+    def evict(self):
+        now = time.time()
+        artifacts = []
+        for entry in os.scandir(REPORTS_PATH):
+            if not entry.name.startswith("report_v"):
+                continue
+            try:
+                modified = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".pdf"):
+                artifacts.append((modified, entry.path))
+            elif entry.name.endswith(".json") and now - modified > REPORT_MAX_AGE:
+                discard(entry.path)
+
+        artifacts.sort(reverse=True)
+        for index, (modified, path) in enumerate(artifacts):
+            if index >= REPORT_KEEP or now - modified > REPORT_MAX_AGE:
+                discard(path)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._heartbeat = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_jobs = ReportJobs(REPORT_WORKERS)
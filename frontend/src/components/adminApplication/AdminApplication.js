@@ -10,25 +10,34 @@ const AdminApplication = () => {
     const [filterStatus, setFilterStatus] = useState("all");
     const [loading, setLoading] = useState(true);
     const [officeInfo, setOfficeInfo] = useState(null);
-    const [officeLoading, setOfficeLoading] = useState(false);
-    const [userInfos, setUserInfos] = useState({});
     const { alertMessage, alertType, showAlert } = useAlert();
 
-    const { getApplications, updateApplication, getOfficeById, getUserById, _apiBase } = useServices();
+    const { getApplicationsFeed, updateApplication, subscribeApplications, _apiBase } = useServices();
+
+    const statusByFilter = { all: null, inProcess: 1, cancelled: 0, approved: 2 };
 
     useEffect(() => {
         fetchApplications();
-    }, []);
+        return subscribeApplications(applyEvent);
+    }, [filterStatus]);
+
+    const applyEvent = (event) => {
+        if (event.type === "created" || event.type === "resync") {
+            fetchApplications();
+            return;
+        }
+        const status = statusByFilter[filterStatus];
+        setApplications(prevApplications => prevApplications
+            .filter(app => app.id !== event.id || (event.type === "updated" && (status === null || event.status === status)))
+            .map(app => app.id === event.id ? { ...app, status: event.status } : app));
+    };
 
     const fetchApplications = () => {
         setLoading(true);
-        getApplications().then(data => {
-            if (data.message) {
-                setApplications([]);
-                showAlert(data.message, "danger");
-            } else {
-                setApplications(data);
-                fetchUsersInfo(data);
+        getApplicationsFeed(statusByFilter[filterStatus]).then(data => {
+            setApplications(data.items);
+            if (data.items.length === 0 && filterStatus === "all") {
+                showAlert("Заявок нет", "danger");
             }
             setLoading(false);
         }).catch(err => {
@@ -38,24 +47,9 @@ const AdminApplication = () => {
         });
     };
 
-    const fetchUsersInfo = (applications) => {
-        const userIds = applications.map(app => app.id_user);
-        const uniqueUserIds = [...new Set(userIds)];
-        const userInfosTemp = {};
-        Promise.all(uniqueUserIds.map(id => getUserById(id).then(data => {
-            userInfosTemp[id] = data;
-        }))).then(() => {
-            setUserInfos(userInfosTemp);
-        }).catch(err => {
-            console.error("Error fetching users info:", err);
-            showAlert("Error fetching users info.", "danger");
-        });
-    };
-
     const handleStatusChange = (appId, statusId) => {
         updateApplication(appId, statusId).then(() => {
             showAlert(statusId === 2 ? "Заявка одобрена" : "Заявка отменена", "success");
-            fetchApplications();
         }).catch(err => {
             console.error("Error updating application:", err);
             showAlert("Error updating application.", "danger");
@@ -66,33 +60,11 @@ const AdminApplication = () => {
         setFilterStatus(e.target.value);
     };
 
-    const handleOfficeClick = (officeId) => {
-        setOfficeLoading(true);
-        getOfficeById(officeId).then(data => {
-            setOfficeInfo(data);
-            setOfficeLoading(false);
-        }).catch(err => {
-            console.error("Error fetching office info:", err);
-            setOfficeLoading(false);
-            showAlert("Error fetching office info.", "danger");
-        });
-    };
-
-    const sortApplications = (apps) => {
-        return apps.sort((a, b) => {
-            if (a.status === 1 && b.status !== 1) return -1;
-            if (a.status !== 1 && b.status === 1) return 1;
-            return 0;
-        });
+    const handleOfficeClick = (office) => {
+        setOfficeInfo(office);
     };
 
-    const filteredApplications = Array.isArray(applications) ? sortApplications(applications).filter(app => {
-        if (filterStatus === "all") return true;
-        if (filterStatus === "inProcess" && app.status === 1) return true;
-        if (filterStatus === "cancelled" && app.status === 0) return true;
-        if (filterStatus === "approved" && app.status === 2) return true;
-        return false;
-    }) : [];
+    const filteredApplications = Array.isArray(applications) ? applications : [];
 
     const getStatusText = (status) => {
         switch (status) {
@@ -151,15 +123,15 @@ const AdminApplication = () => {
                                 </div>
                                 <div className="wrapper-application-lastName col-7 col-xxl-2 pe-2 pb-2">
                                     <h6>Фамилия:</h6>
-                                    <h5>{userInfos[app.id_user]?.lastName}</h5>
+                                    <h5>{app.user?.lastName}</h5>
                                 </div>
                                 <div className="wrapper-application-firstName col-5 col-xxl-2 pe-2 pb-2">
                                     <h6>Имя:</h6>
-                                    <h5>{userInfos[app.id_user]?.firstName}</h5>
+                                    <h5>{app.user?.firstName}</h5>
                                 </div>
                                 <div className="wrapper-application-phone col-7 col-xxl-2 pe-2 pb-2">
                                     <h6>Моб. тел:</h6>
-                                    <h5><a style={{ textDecoration: "underline" }} href={`tel:+${String(userInfos[app.id_user]?.tel).replace("-", "")}`}>+{userInfos[app.id_user]?.tel}</a></h5>
+                                    <h5><a style={{ textDecoration: "underline" }} href={`tel:+${String(app.user?.tel).replace("-", "")}`}>+{app.user?.tel}</a></h5>
                                 </div>
                                 <div className="wrapper-application-office col-5 col-xxl-1 pe-2 pb-2">
                                     <h6>Офис:</h6>
@@ -167,7 +139,7 @@ const AdminApplication = () => {
                                         style={{ textDecoration: "underline", cursor: "pointer" }}
                                         data-bs-toggle="modal"
                                         data-bs-target="#modalApplication" 
-                                        onClick={() => handleOfficeClick(app.id_office)}  
+                                        onClick={() => handleOfficeClick(app.office)}  
                                     >{app.id_office}</h5>
                                 </div>
                                 {app.status === 1 ? (
@@ -194,12 +166,12 @@ const AdminApplication = () => {
                     )
                 )}
             </div>
-            <ViewModal officeLoading={officeLoading} officeInfo={officeInfo} _apiBase={_apiBase}/>
+            <ViewModal officeInfo={officeInfo} _apiBase={_apiBase}/>
         </>
     )
 }
 
-const ViewModal = ({officeLoading, officeInfo, _apiBase}) => {
+const ViewModal = ({officeInfo, _apiBase}) => {
     return (
         <div className="modal" id="modalApplication" tabIndex="-1" aria-labelledby="modalApplicationeLabel" aria-hidden="true">
             <div className="modal-dialog modal-lg modal-dialog-centered modal-dialog-scrollable">
@@ -208,11 +180,7 @@ const ViewModal = ({officeLoading, officeInfo, _apiBase}) => {
                         <div style={{ cursor: "pointer", top: "10px", right: "20px", borderRadius: "0.3rem" }} className="btn btn-outline-dark position-absolute" data-bs-dismiss="modal" aria-label="close">
                             <i className="bi fa-lg bi-x-lg"></i>
                         </div>
-                        {officeLoading ? (
-                            <div className='text-center py-3'>
-                                <Spinner />
-                            </div>
-                        ) : officeInfo ? (
+                        {officeInfo ? (
                             <>
                                 <div id="carouselIndicators" className="carousel carousel-dark slide col-12" data-bs-ride="carousel">
                                     <div className="carousel-inner">
@@ -67,37 +67,12 @@ const AdminModal = ({ officeId, fetchOffices, setOfficeId }) => {
         fileInputRef.current.files = updatedFiles.files;
     };
 
-    const convertImageToBase64 = async (imageUrl) => {
-        try {
-            const response = await fetch(imageUrl, { mode: 'cors' }, {headers: new Headers({'Content-Type': 'application/json', 'x-admin-token': localStorage.getItem("token")})});
-            const blob = await response.blob();
-            return new Promise((resolve, reject) => {
-                const reader = new FileReader();
-                reader.onloadend = () => resolve(reader.result);
-                reader.onerror = reject;
-                reader.readAsDataURL(blob);
-            });
-        } catch (error) {
-            console.error('Failed to fetch image:', error);
-            throw error;
-        }
-    };
-
-    const convertPhotosToBase64 = async (photos) => {
-        const base64Photos = await Promise.all(photos.map(async (photo) => {
-            if (typeof photo === 'string') {
-                return await convertImageToBase64(`${_apiBase}/${photo}`);
-            } else {
-                return photo.base64;
-            }
-        }));
-        return base64Photos;
-    };
+    const collectPhotos = (photos) => photos.map(photo => typeof photo === 'string' ? photo : photo.base64);
 
     const handleSubmit = async (e) => {
         e.preventDefault();
 
-        await convertPhotosToBase64(photos)
+        await Promise.resolve(collectPhotos(photos))
         .then((data) => {
             const updatedData = { ...updatedOffice, photos: data };
 
@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import ReactStringReplace from "react-string-replace";
 
 import AdminModal from "../adminModal/AdminModal";
@@ -11,24 +11,45 @@ import "./adminOffice.scss"
 import ModalAddOffice from "../modalAddOffice/ModalAddOffice";
 
 const AdminOffice = () => {
-    const { getOffices, deleteOfficeById, _apiBase } = useServices();
+    const { getOffices, searchOffices, deleteOfficeById, _apiBase } = useServices();
     const [loading, setLoading] = useState(true);
     const [offices, setLocalOffices] = useState([]);
     const [filteredOffices, setFilteredOffices] = useState([]);
     const [selectedOfficeId, setSelectedOfficeId] = useState(null);
     const [searchQuery, setSearchQuery] = useState("");
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const { alertMessage, alertType, showAlert } = useAlert();
+    const searchRef = useRef("");
 
     useEffect(() => {
         fetchAdminOffices();
     }, []);
 
+    const searchResult = (office) => ({ ...office, photo: office.photos[0], photo_variant: office.photo_variants[0] });
+
+    const runSearch = (query, list = offices) => {
+        searchRef.current = query;
+        if (query === "") {
+            setFilteredOffices(list);
+            return;
+        }
+        searchOffices(query)
+            .then(data => {
+                if (searchRef.current === query) {
+                    setFilteredOffices(data.map(searchResult));
+                }
+            })
+            .catch(err => console.error("Error searching offices:", err));
+    };
+
     const fetchAdminOffices = () => {
         setLoading(true);
         getOffices()
             .then(data => {
-                setLocalOffices(data);
-                setFilteredOffices(data);
+                setLocalOffices(data.items);
+                runSearch(searchRef.current, data.items);
+                setNextCursor(data.next_cursor);
                 setLoading(false);
             })
             .catch(err => {
@@ -37,6 +58,24 @@ const AdminOffice = () => {
             });
     };
 
+    const fetchMoreOffices = () => {
+        setLoadingMore(true);
+        getOffices(undefined, undefined, nextCursor)
+            .then(data => {
+                const loaded = [...offices, ...data.items];
+                setLocalOffices(loaded);
+                if (searchRef.current === "") {
+                    setFilteredOffices(loaded);
+                }
+                setNextCursor(data.next_cursor);
+                setLoadingMore(false);
+            })
+            .catch(err => {
+                console.error("Error fetching offices:", err);
+                setLoadingMore(false);
+            });
+    };
+
     const handleDelete = (officeId) => {
         setLoading(true);
         deleteOfficeById(officeId)
@@ -58,13 +97,7 @@ const AdminOffice = () => {
     const handleSearch = (e) => {
         const query = e.target.value.toLowerCase().replace(/[-\s]/g, "");
         setSearchQuery(query);
-        if (query === "") {
-            setFilteredOffices(offices);
-        } else {
-            setFilteredOffices(offices.filter(office => 
-                office.name.toLowerCase().replace(/[-\s]/g, "").includes(query)
-            ));
-        }
+        runSearch(query);
     };
 
     const highlightText = (text, highlight) => {
@@ -105,7 +138,7 @@ const AdminOffice = () => {
                         <div className="offices-wrapper wrapper col-12 mt-2" key={office.id}>
                             <div className="wrapper-office col-12 d-flex flex-wrap">
                                 <div className="wrapper-office-photo col-12 col-xxl-2">
-                                    <img style={{maxWidth: "100%"}} className="img-fluid" src={`${_apiBase}/${office.photos[0]}`} alt="Office" />
+                                    <img style={{maxWidth: "100%"}} className="img-fluid" src={`${_apiBase}/${office.photo_variant?.thumb ?? office.photo}`} onError={(e) => { e.target.onerror = null; e.target.src = `${_apiBase}/${office.photo}`; }} alt="Office" />
                                 </div>
                                 <div className="wrapper-office-name col-12 col-xxl-2 py-2 px-xxl-2 py-xxl-0">
                                     <h6>Название:</h6>
@@ -131,6 +164,11 @@ const AdminOffice = () => {
                         </div>
                     ))
                 )}
+                {!loading && searchQuery === "" && nextCursor !== null && (
+                    <div style={{fontWeight: 500, fontSize: 18}} className={`btn btn-outline-dark col-12 mt-2 py-1 rounded-0 ${loadingMore ? 'disabled' : ''}`} onClick={fetchMoreOffices}>
+                        Показать ещё
+                    </div>
+                )}
             </div>
             <AdminModal fetchOffices={fetchAdminOffices} officeId={selectedOfficeId} setOfficeId={setSelectedOfficeId}/>
             <ModalAddOffice fetchOffices={fetchAdminOffices}/>
@@ -7,7 +7,7 @@ import UserModal from "../userModal/UserModal";
 import "./appChat.scss"
 
 const AppChat = ({userRole}) => {
-    const { getOfficeByOptions, _apiBase } = useServices();
+    const { getOfficeByOptions, getOfficeFacets, _apiBase } = useServices();
     const FAQ = {
         "Могу ли я посмотреть офис перед арендой?": "Да, мы всегда рекомендуем нашим клиентам лично осмотреть офис перед принятием окончательного решения об аренде. Это поможет вам лучше понять, подходит ли вам это пространство.",
         "Что произойдет, если я захочу расторгнуть договор аренды досрочно?": "Условия досрочного расторжения договора аренды обычно указываются в самом договоре. Они могут варьироваться, поэтому важно внимательно прочитать договор перед подписанием.",
@@ -176,11 +176,16 @@ const AppChat = ({userRole}) => {
         ]);
 
         getOfficeByOptions({ minArea, maxArea, minPrice, maxPrice })
-            .then((data) => {
+            .then((data) => data.items.length
+                ? [data, null]
+                : getOfficeFacets({ minArea, maxArea, minPrice, maxPrice }).then((facets) => [data, facets], () => [data, null]))
+            .then(([data, facets]) => {
                 setLoading(false);
                 setChatMessages(chatMessages => [
                     ...chatMessages,
-                    ...renderOffices(data),
+                    ...renderOffices(data.items),
+                    ...(data.next_cursor !== null ? renderMessage([{role: "Chat", message: `Показаны первые ${data.items.length} офисов — уточните параметры поиска, чтобы увидеть остальные.`}]) : []),
+                    ...(facets ? renderMessage([{role: "Chat", message: suggestRanges(facets)}]) : []),
                 ]);
                 setButtons(renderButtons(["Поиск подходящего офиса", "FAQ"]));
             })
@@ -190,13 +195,30 @@ const AppChat = ({userRole}) => {
             });
     };
 
+    const facetRange = ({ edges, counts }) => {
+        const filled = counts.map((count, i) => count ? i : -1).filter((i) => i !== -1);
+        if (!filled.length) return null;
+        return [Math.floor(edges[filled[0]]), Math.ceil(edges[filled[filled.length - 1] + 1])];
+    };
+
+    const suggestRanges = (facets) => {
+        const price = facetRange(facets.price);
+        const area = facetRange(facets.area);
+        if (!price && !area) return null;
+        return <>
+            Попробуйте изменить параметры поиска.<br />
+            {price && <>При указанной площади есть офисы ценой от {price[0]} до {price[1]} BYN.<br /></>}
+            {area && <>При указанной цене есть офисы площадью от {area[0]} до {area[1]} м².<br /></>}
+        </>;
+    };
+
     const renderOffices = (offices) => {
-        const officeElements = Array.isArray(offices) ? offices?.map((office) => (
+        const officeElements = offices?.length ? offices.map((office) => (
             <div className="alert alert-light col-12 text-start" key={office.id}>
                 <div className="offices-wrapper">
                     <div className="wrapper-office col-12 d-flex flex-wrap">
                         <div className="wrapper-office-photo col-12 col-xxl-1">
-                            <img style={{maxWidth: "100%"}} className="img-fluid" src={`${_apiBase}/${office.photos[0]}`} alt="Office" />
+                            <img style={{maxWidth: "100%"}} className="img-fluid" src={`${_apiBase}/${office.photo_variant?.thumb ?? office.photo}`} onError={(e) => { e.target.onerror = null; e.target.src = `${_apiBase}/${office.photo}`; }} alt="Office" />
                         </div>
                         <div className="wrapper-office-name col-12 col-xxl-3 py-2 px-xxl-2 py-xxl-0">
                             <h6>Название:</h6>
@@ -9,7 +9,7 @@ const ModalAddOffice = ({ fetchOffices }) => {
     const [photos, setPhotos] = useState([]);
     const fileInputRef = useRef(null);
     const { alertMessage, alertType, showAlert } = useAlert();
-    const { addOffice } = useServices();
+    const { addOffice, uploadOfficePhotos } = useServices();
 
     const onSubmitOffice = (e) => {
         e.preventDefault();
@@ -17,9 +17,11 @@ const ModalAddOffice = ({ fetchOffices }) => {
         const data = Object.fromEntries(new FormData(e.target).entries());
         data.price = +data.price;
         data.area = +data.area;
-        data.photos = photos.map(photo => photo.base64);
+        data.photos = [];
 
         addOffice(data).then((json) => {
+            return photos.length !== 0 ? uploadOfficePhotos(json.id, photos.map(photo => photo.file)) : null;
+        }).then(() => {
             fetchOffices();
             e.target.reset();
             setPhotos([]);
@@ -37,7 +39,7 @@ const ModalAddOffice = ({ fetchOffices }) => {
             if (file.type.startsWith('image/') && (file.type.endsWith('jpeg') || file.type.endsWith('jpg') || file.type.endsWith('png'))) {
                 const reader = new FileReader();
                 reader.onloadend = () => {
-                    setPhotos(prevPhotos => [...prevPhotos, { base64: reader.result, name: file.name }]);
+                    setPhotos(prevPhotos => [...prevPhotos, { base64: reader.result, name: file.name, file }]);
                 };
                 reader.readAsDataURL(file);
             } else {
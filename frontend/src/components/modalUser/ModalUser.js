@@ -45,7 +45,8 @@ const ModalUser = ({ userId, fetchUsers }) => {
 
     const handleSave = (e) => {
         e.preventDefault();
-        updateUserById(userId, user).then(() => {
+        const { password, ...rest } = user;
+        updateUserById(userId, password ? user : rest).then(() => {
             showAlert("Информация о пользователе сохранена", "success");
             fetchUsers();
         }).catch(err => {
@@ -101,16 +102,16 @@ const ModalUser = ({ userId, fetchUsers }) => {
                                         <input name="email" className="form-control col-12" type="email" value={user.email} onChange={handleChange} required />
                                     </div>
                                     <div className="input-container col-12 col-md-5 col-xxl-4 p-2">
-                                        <label htmlFor="password">Пароль <span className="text-danger">*</span></label>
+                                        <label htmlFor="password">Новый пароль</label>
                                         <NavPassword
                                             name="password"
                                             className="form-control col-12"
                                             type="password"
-                                            value={user.password}
+                                            placeholder="Без изменений"
+                                            value={user.password || ''}
                                             onChange={handleChange}
                                             minLength={8}
                                             maxLength={16}
-                                            required
                                         />
                                     </div>
                                     <div className="btn-group input-container col-12 p-2 text-center" role="group">
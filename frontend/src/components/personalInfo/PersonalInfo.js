@@ -56,6 +56,9 @@ const PersonalInfo = () => {
 
         const data = Object.fromEntries(new FormData(e.target).entries());
         data.age = +data.age;
+        if (!data.password) {
+            delete data.password;
+        }
 
         updateUserByToken(localStorage.getItem("token"), data)
         .then(response => {
@@ -108,15 +111,14 @@ const PersonalInfo = () => {
                             <input onChange={handleChange} name="email" className="form-control col-12" type="email" placeholder="Example@gmail.com" value={userInfo?.email} required/>
                         </div>
                         <div className="input-container col-12 col-md-5 col-xxl-4 p-2">
-                            <label htmlFor="password">Пароль <span className="text-danger">*</span></label>
+                            <label htmlFor="password">Новый пароль</label>
                             <NavPassword
                                 name="password"
-                                placeholder="Пароль"
+                                placeholder="Без изменений"
                                 minLength={8}
                                 maxLength={16}
-                                value={userInfo?.password}
+                                value={userInfo?.password || ''}
                                 onChange={handleChange}
-                                required
                             />
                         </div>
                         <div className="form-controls text-center col-12 col-md-5 col-xxl-4 mt-4 px-2">
@@ -16,13 +16,32 @@ const UserApplication = () => {
 
     const token = localStorage.getItem("token");
 
-    const { getApplicationsByToken, getUserByToken, updateApplication, getOfficeById, _apiBase } = useServices();
+    const { getApplicationsByToken, getUserByToken, updateApplication, getOfficeById, subscribeApplications, _apiBase } = useServices();
 
     useEffect(() => {
         fetchApplications();
         fetchUserInfo();
+        return subscribeApplications(applyEvent);
     }, []);
 
+    const applyEvent = (event) => {
+        if (event.type === "resync") {
+            fetchApplications();
+            return;
+        }
+        const { type, ...application } = event;
+        setApplications(prevApplications => {
+            const rest = prevApplications.filter(app => app.id !== application.id);
+            if (type === "deleted") {
+                return rest;
+            }
+            if (rest.length === prevApplications.length) {
+                return [...rest, application];
+            }
+            return prevApplications.map(app => app.id === application.id ? { ...app, ...application } : app);
+        });
+    };
+
     const fetchUserInfo = () => {
         const token = localStorage.getItem("token");
         getUserByToken(token).then(data => {
@@ -53,7 +72,6 @@ const UserApplication = () => {
     const handleStatusChange = (appId, statusId) => {
         updateApplication(appId, statusId).then(() => {
             showAlert(statusId === 2 ? "Заявка одобрена" : "Заявка отменена", "success");
-            fetchApplications();
         }).catch(err => {
             console.error("Error updating application:", err);
             showAlert("Error updating application.", "danger");
@@ -16,7 +16,7 @@ const UserOffices = () => {
     const [searchQuery, setSearchQuery] = useState("");
     const { alertMessage, alertType, showAlert } = useAlert();
 
-    const { getFavoriteOffices, getOfficeById, deleteFavoriteOffice, _apiBase } = useServices();
+    const { getFavoriteOfficesDetails, deleteFavoriteOffice, _apiBase } = useServices();
 
     const userToken = localStorage.getItem("token");
 
@@ -26,11 +26,10 @@ const UserOffices = () => {
 
     const fetchUserOffices = () => {
         setLoading(true);
-        getFavoriteOffices(userToken)
+        getFavoriteOfficesDetails(userToken)
             .then(data => {
                 if(!data.message) {
-                    const officePromises = data.map(officeId => getOfficeById(officeId));
-                    return Promise.all(officePromises);
+                    return data;
                 } else {
                     showAlert(data.message, "danger");
                     return []
@@ -110,7 +109,7 @@ const UserOffices = () => {
                     <div className="offices-wrapper wrapper col-12 mt-2" key={office.id}>
                         <div className="wrapper-office col-12 d-flex flex-wrap">
                             <div className="wrapper-office-photo col-12 col-xxl-2">
-                                <img className="img-fluid" src={`${_apiBase}/${office.photos[0]}`} alt="Office" />
+                                <img className="img-fluid" src={`${_apiBase}/${office.photo_variants?.[0]?.thumb ?? office.photos[0]}`} onError={(e) => { e.target.onerror = null; e.target.src = `${_apiBase}/${office.photos[0]}`; }} alt="Office" />
                             </div>
                             <div className="wrapper-office-name col-12 col-xxl-2 py-2 px-xxl-2 py-xxl-0">
                                 <h6>Название:</h6>
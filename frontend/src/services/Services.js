@@ -30,6 +30,26 @@ const useServices = () => {
         return method !== 'DELETE' ? await res.json() : { message: 'Удалено' };
     };
 
+    const sendFiles = async (url, files) => {
+        const formData = new FormData();
+        files.forEach(file => formData.append('files', file));
+
+        const res = await fetch(url, {
+            method: 'POST',
+            body: formData,
+            mode: 'cors',
+            headers: new Headers({
+                'x-admin-token': localStorage.getItem("token")
+            }),
+        });
+
+        if (!res.ok) {
+            throw new Error(`HTTP error! status: ${res.status}`);
+        }
+
+        return await res.json();
+    };
+
     const register = (json) => sendData(`${_apiBase}/reg`, json, "POST");
 
     const login = (json) => sendData(`${_apiBase}/login`, json, "POST");
@@ -38,27 +58,64 @@ const useServices = () => {
 
     const addOffice = async (json) => await sendData(`${_apiBase}/office`, json, "POST");
 
+    const uploadOfficePhotos = (officeId, files) => sendFiles(`${_apiBase}/office/${officeId}/photos`, files);
+
     const addFavoriteOffice = (token, officeId) => sendData(`${_apiBase}/user/${token}/favorite/${officeId}`, {}, 'POST');
 
     const addApplications = (token, officeId) => sendData(`${_apiBase}/applications/${token}/${officeId}`, {}, 'POST');
 
-    const getOffices = () => getResources(`${_apiBase}/office`);
+    const getOffices = (fields = "id,name,address,price,photo", limit = 50, afterId = null) => getResources(`${_apiBase}/office?fields=${fields}&limit=${limit}${afterId !== null ? `&after_id=${afterId}` : ""}`);
 
     const getOfficeById = (id) => getResources(`${_apiBase}/office/${id}`);
 
+    const getOfficeFavoritesCount = (id) => getResources(`${_apiBase}/office/${id}/favorites`);
+
     const getApplications = () => getResources(`${_apiBase}/applications`);
 
+    const getApplicationsFeed = (status = null) => getResources(`${_apiBase}/applications/feed${status !== null ? `?status=${status}` : ""}`);
+
     const getApplicationsByToken = (token) => getResources(`${_apiBase}/user/${token}/applications`);
 
+    const subscribeApplications = (onEvent) => {
+        let source = null;
+        let closed = false;
+
+        const connect = (reconnect) => sendData(`${_apiBase}/applications/events/ticket`, {}, 'POST')
+            .then(({ ticket }) => {
+                if (closed) return;
+                source = new EventSource(`${_apiBase}/applications/events?ticket=${encodeURIComponent(ticket)}`);
+                source.addEventListener('application', (e) => onEvent(JSON.parse(e.data)));
+                source.onerror = () => {
+                    if (source.readyState === EventSource.CLOSED && !closed) {
+                        setTimeout(() => connect(true), 3000);
+                    }
+                };
+                if (reconnect) onEvent({ type: "resync" });
+            })
+            .catch(() => {
+                if (!closed) setTimeout(() => connect(reconnect), 3000);
+            });
+
+        connect(false);
+        return () => {
+            closed = true;
+            source?.close();
+        };
+    };
+
     const getUserByToken = (token) => getResources(`${_apiBase}/users/${token}`);
 
     const getFavoriteOffices = (token) => getResources(`${_apiBase}/user/${token}/favorite`);
 
+    const getFavoriteOfficesDetails = (token, fields = "id,name,address,price,photos") => getResources(`${_apiBase}/user/${token}/favorite/offices?fields=${fields}`);
+
     const getUsers = () => getResources(`${_apiBase}/users`);
 
     const getUserById = (id) => getResources(`${_apiBase}/users/id/${id}`);
 
-    const getOfficeByOptions = (json) => sendData(`${_apiBase}/office/search`, json, 'POST');
+    const getOfficeByOptions = (json, fields = "id,name,address,price,photo", limit = 20) => sendData(`${_apiBase}/office/search?fields=${fields}&limit=${limit}`, json, 'POST');
+
+    const getOfficeFacets = (json, buckets = 10) => sendData(`${_apiBase}/office/search/facets?buckets=${buckets}`, json, 'POST');
 
     const getRoleByToken = (token) => getResources(`${_apiBase}/user/role/${token}`);
 
@@ -72,6 +129,8 @@ const useServices = () => {
 
     const updateApplication = (appId, statusId) => sendData(`${_apiBase}/applications/${appId}/${statusId}`, {}, "PUT")
 
+    const updateApplicationsStatus = (ids, status, onlyStatus = null) => sendData(`${_apiBase}/applications/status`, {ids, status, only_status: onlyStatus}, "PUT")
+
     const updateUserById = (id, json) => sendData(`${_apiBase}/users/id/${id}`, json, "PUT")
 
     const deleteOfficeById = (id) => sendData(`${_apiBase}/office/${id}`, null, "DELETE")
@@ -108,23 +167,30 @@ const useServices = () => {
         updateUserByToken,
         deleteUserByToken,
         addOffice,
+        uploadOfficePhotos,
         getOffices,
         deleteOfficeById,
         updateOfficeById,
         getOfficeById,
+        getOfficeFavoritesCount,
         addOfficeToFavorite,
         getFavoriteOffices,
+        getFavoriteOfficesDetails,
         addFavoriteOffice,
         getApplications,
+        getApplicationsFeed,
         addApplications,
         updateApplication,
+        updateApplicationsStatus,
         getUsers,
         getUserById,
         updateUserById,
         deleteUserById,
         getOfficeByOptions,
+        getOfficeFacets,
         getRoleByToken,
         getApplicationsByToken,
+        subscribeApplications,
         deleteApplicationById,
         deleteFavoriteOffice,
         searchUsersByPhone,